@@ -1,56 +1,376 @@
 ﻿import csv
 import numpy as np
-import tkinter as tk
-from tkinter import filedialog
+
+from dataExport import write_columns_csv
+from diagnostics import get_logger, stage
+
+log = get_logger("ByteCombine")
 
 baseline_adc_value = 53.248  # Default ADC baseline (same as previously hardcoded)
 
+SAMPLE_RATE = 1_220_000  # Hz
+SAMPLE_PERIOD = 1 / SAMPLE_RATE  # ~819.67 ns
+BYTES_PER_SAMPLE = 4  # [ADC1 high, ADC1 low, ADC2 high, ADC2 low]
+OUTLIER_BLOCK_ELEMENTS = 1 << 22  # Max window elements medianed per block in detect_and_remove_outliers
+
 def process_dc_bias_data(data, return_data=False):
-    print("process_dc_bias_data() called")
-    from ByteCombine import map_adc_to_current
-    avg_currents = []
+    log.debug("process_dc_bias_data() called")
+    samples = rows_to_array(data)
 
-    for row in data:
-        if len(row) >= 5:
-            try:
-                adc1 = (int(row[1]) << 8) | int(row[2])
-                adc2 = (int(row[3]) << 8) | int(row[4])
-                avg_adc = (adc1 + adc2) / 2.0
-                current = map_adc_to_current(avg_adc)
-                avg_currents.append(current)
-                # print(f"ADC1: {adc1}, ADC2: {adc2}, Avg: {avg_adc:.2f}, Current: {current:.6f}")
-            except Exception as e:
-                print(f"Error parsing row {row}: {e}")
-
-    if not avg_currents:
-        print("No valid current samples found.")
+    if len(samples) == 0:
+        log.warning("No valid current samples found.")
         return [], []
 
-    dc_bias = sum(avg_currents) / len(avg_currents)
-    print(f"Calculated DC Bias: {dc_bias:.6f} A from {len(avg_currents)} samples")
+    _, avg_currents = convert_samples(samples)
+    dc_bias = float(avg_currents.mean())
+    log.info("Calculated DC Bias: %.6f A from %d samples", dc_bias, len(avg_currents))
 
     if return_data:
-        times = [row[0] for row in data if len(row) >= 5]
+        times = samples[:, 0].tolist()
         return times, [dc_bias] * len(times)
 
     return dc_bias
 
+class RunningStats:
+    """Running mean, variance, min and max, updated one chunk of samples at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+
+        # Merge chunk moments into the running totals (Chan et al. parallel update)
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+def stream_dc_bias(frame_chunks, on_update=None, baseline=None):
+    """
+    Streams (n, 4) frame chunks through conversion into a RunningStats; chunks
+    are discarded once folded in, so memory stays constant for any capture length.
+
+    Parameters:
+    - frame_chunks: Iterable of (n, 4) byte frames, e.g. from a serial chunk generator
+    - on_update: Optional callback receiving the RunningStats after every chunk
+    - baseline: ADC baseline (defaults to baseline_adc_value)
+
+    Returns:
+    - The final RunningStats
+    """
+    stats = RunningStats()
+    for frames in frame_chunks:
+        with stage("conversion", len(frames)):
+            stats.update(convert_frames(frames, baseline))
+        if on_update:
+            on_update(stats)
+    return stats
+
+def dc_bias_trace(stats, sample_period=SAMPLE_PERIOD):
+    """Flat (times, currents) trace spanning the capture at the streamed DC bias."""
+    if stats.count == 0:
+        return [], []
+    end_time = (stats.count - 1) * sample_period
+    return [0.0, end_time], [stats.mean, stats.mean]
+
+TRIGGER_EDGES = ["Rising", "Falling", "Either"]
+
+def edge_crossings(fire, arm, state=0):
+    """
+    Indices where `fire` becomes true while the latch is armed. The latch arms
+    on `arm` samples, disarms on `fire` samples and holds in between, which is
+    what gives the hysteresis band. `state` is the latch (-1 armed, 1 fired,
+    0 unknown) carried over from a previous chunk.
+
+    Returns:
+    - (indices, latch state after the last sample)
+    """
+    if len(fire) == 0:
+        return np.empty(0, dtype=np.int64), state
+    zone = np.zeros(len(fire), dtype=np.int8)
+    zone[arm] = -1
+    zone[fire] = 1
+
+    # Forward-fill the last decided zone over the band samples
+    last = np.where(zone != 0, np.arange(len(zone)), -1)
+    np.maximum.accumulate(last, out=last)
+    latch = np.where(last >= 0, zone[last], np.int8(state))
+
+    previous = np.concatenate(([state], latch[:-1]))
+    return np.flatnonzero((latch == 1) & (previous == -1)), int(latch[-1])
+
+def apply_holdoff(indices, holdoff, next_allowed=0):
+    """Drops triggers within `holdoff` samples after an accepted one. Returns (kept, next allowed index)."""
+    if holdoff <= 0 or len(indices) == 0:
+        return indices, next_allowed
+    kept = []
+    position = np.searchsorted(indices, next_allowed)
+    while position < len(indices):
+        index = int(indices[position])
+        kept.append(index)
+        next_allowed = index + holdoff
+        position = np.searchsorted(indices, next_allowed, side='left')
+    return np.asarray(kept, dtype=np.int64), next_allowed
+
+class TriggerEngine:
+    """
+    Level trigger shared by file, capture and live data.
+
+    - edge: "Rising", "Falling" or "Either"
+    - hysteresis: Band (same unit as the level) the signal must leave on the
+      far side of the level before the edge can fire again; 0 reproduces a
+      plain level crossing
+    - holdoff: Samples after an accepted trigger during which no new one fires
+
+    find() scans a whole trace; feed() scans consecutive chunks of a stream and
+    keeps the latch and holdoff across chunk boundaries.
+    """
+
+    def __init__(self, level, edge="Rising", hysteresis=0.0, holdoff=0):
+        if edge not in TRIGGER_EDGES:
+            raise ValueError(f"Unknown trigger edge: {edge}")
+        self.level = float(level)
+        self.edge = edge
+        self.hysteresis = abs(float(hysteresis))
+        self.holdoff = int(holdoff)
+        self.reset()
+
+    def reset(self):
+        self.rising_state = 0
+        self.falling_state = 0
+        self.next_allowed = 0
+        self.offset = 0  # Samples fed so far
+
+    def find(self, y):
+        """All trigger indices of `y`, ascending, in one vectorized pass."""
+        self.reset()
+        return self.feed(y)
+
+    def feed(self, y):
+        """Trigger indices of the next chunk `y`, relative to the chunk start."""
+        y = np.asarray(y, dtype=np.float64)
+        hits = []
+        if self.edge in ("Rising", "Either"):
+            rising, self.rising_state = edge_crossings(y >= self.level, y < self.level - self.hysteresis,
+                                                       self.rising_state)
+            hits.append(rising)
+        if self.edge in ("Falling", "Either"):
+            falling, self.falling_state = edge_crossings(y <= self.level, y > self.level + self.hysteresis,
+                                                         self.falling_state)
+            hits.append(falling)
+        indices = hits[0] if len(hits) == 1 else np.union1d(hits[0], hits[1])
+
+        kept, next_allowed = apply_holdoff(indices + self.offset, self.holdoff, self.next_allowed)
+        self.next_allowed = next_allowed
+        self.offset += len(y)
+        return kept - (self.offset - len(y))
+
+    def crossing_times(self, x, y, indices):
+        """
+        Sub-sample trigger times: linear interpolation between the sample before
+        each trigger index and the trigger sample itself.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        indices = np.asarray(indices, dtype=np.int64)
+        times = x[indices]
+
+        inner = indices > 0
+        i = indices[inner]
+        dy = y[i] - y[i - 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(dy != 0, (self.level - y[i - 1]) / dy, 1.0)
+        times[inner] = x[i - 1] + np.clip(fraction, 0.0, 1.0) * (x[i] - x[i - 1])
+        return times
+
+    def trigger_time(self, x, y, event=1):
+        """
+        Interpolated time of the `event`-th trigger (1-based) in the trace, or
+        None if there are fewer events. Also returns the total number found.
+        """
+        indices = self.find(y)
+        if event < 1 or event > len(indices):
+            return None, len(indices)
+        return float(self.crossing_times(x, y, indices[event - 1:event])[0]), len(indices)
+
+class WaveformAverager:
+    """
+    Per-sample running mean, std, min and max over repeated captures, on a
+    fixed time grid (e.g. seconds relative to the trigger). Each capture is
+    folded in and dropped, so memory is O(len(grid)) for any number of captures.
+    """
+
+    def __init__(self, grid):
+        self.grid = np.asarray(grid, dtype=np.float64)
+        self.captures = 0
+        self.count = np.zeros(len(self.grid), dtype=np.int64)
+        self.mean = np.zeros(len(self.grid))
+        self.m2 = np.zeros(len(self.grid))
+        self.min = np.full(len(self.grid), np.inf)
+        self.max = np.full(len(self.grid), -np.inf)
+        self._delta = np.empty(len(self.grid))  # Scratch, reused by every add()
+
+    def add(self, x, y, trigger_time=0.0):
+        """
+        Folds in one capture. It is resampled onto grid + trigger_time (linear
+        interpolation, so sub-sample trigger offsets line up); grid points
+        outside the capture are skipped for this capture.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(x) == len(self.grid) and trigger_time == 0.0 and np.array_equal(x, self.grid):
+            values = y
+        else:
+            values = np.interp(self.grid + trigger_time, x, y, left=np.nan, right=np.nan)
+
+        valid = ~np.isnan(values)
+        self.count += valid
+        delta = np.subtract(values, self.mean, out=self._delta)
+        delta[~valid] = 0.0
+        self.mean += np.divide(delta, self.count, out=np.zeros_like(delta), where=self.count > 0)
+        self.m2 += delta * np.where(valid, values - self.mean, 0.0)
+        np.fmin(self.min, values, out=self.min)
+        np.fmax(self.max, values, out=self.max)
+        self.captures += 1
+
+    @property
+    def covered(self):
+        """Grid points that received at least one sample."""
+        return self.count > 0
+
+    @property
+    def std(self):
+        return np.sqrt(np.divide(self.m2, self.count, out=np.zeros_like(self.m2), where=self.count > 0))
+
+    def result(self):
+        """(x, mean, envelope) over covered grid points; envelope is {"min", "max", "std"} arrays."""
+        covered = self.covered
+        envelope = {"min": self.min[covered], "max": self.max[covered], "std": self.std[covered]}
+        return self.grid[covered], self.mean[covered], envelope
+
 def map_adc_to_current(adc_avg):
     global baseline_adc_value
 
     # Check the baseline_adc_value and adc_avg
-    print(f"Baseline ADC Value: {baseline_adc_value}")
-    print(f"ADC Average: {adc_avg}")
+    log.debug("Baseline ADC Value: %s", baseline_adc_value)
+    log.debug("ADC Average: %s", adc_avg)
 
     # Original formula for current (before correction)
     original_current = (((((adc_avg - baseline_adc_value) / 65536.0) * 3.323) / 1.4773))
-    print(f"Original Current: {original_current}")
+    log.debug("Original Current: %s", original_current)
 
     # Apply the inverse of the regression to get the expected current
     expected_current = (((original_current + 0.0008) / 0.9998) - 0.039) / 0.9944
-    print(f"Expected Current: {expected_current}")
+    log.debug("Expected Current: %s", expected_current)
+
+    return expected_current
 
-    return expected_current 
+def adc_to_current(adc_avg, baseline=None):
+    """
+    Vectorized form of map_adc_to_current.
+
+    Parameters:
+    - adc_avg: Scalar or NumPy array of averaged ADC words
+    - baseline: ADC baseline to subtract (defaults to the zeroed baseline_adc_value)
+
+    Returns:
+    - Current in A, same shape as adc_avg
+    """
+    if baseline is None:
+        baseline = baseline_adc_value
+    original_current = (((adc_avg - baseline) / 65536.0) * 3.323) / 1.4773
+    return (((original_current + 0.0008) / 0.9998) - 0.039) / 0.9944
+
+def rows_to_array(data):
+    """
+    Packs [time, byte1, byte2, byte3, byte4] rows into an (N, 5) float array.
+    Rows that are too short or not numeric are skipped, as in the per-row loops.
+    """
+    try:
+        array = np.asarray(data, dtype=np.float64)
+        if array.ndim == 2 and array.shape[1] >= 5:
+            return array[:, :5]
+    except (ValueError, TypeError):
+        pass
+
+    rows = []
+    for row in data:
+        if len(row) >= 5:
+            try:
+                rows.append([float(v) for v in row[:5]])
+            except (ValueError, TypeError) as e:
+                log.warning("Row caused error: %s → %s", row, e)
+    return np.array(rows, dtype=np.float64).reshape(-1, 5)
+
+def read_raw_csv(csv_path):
+    """Reads a raw byte capture CSV (time in ms) into an (N, 5) array with time in seconds."""
+    rows = []
+    with open(csv_path, 'r') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader, None)
+        for row in reader:
+            if len(row) >= 5 and all(r.isdigit() for r in row[1:5]):
+                rows.append(row[:5])
+    samples = np.array(rows, dtype=np.float64).reshape(-1, 5)
+    samples[:, 0] /= 1000.0
+    return samples
+
+def convert_samples(samples, sample_period=SAMPLE_PERIOD, baseline=None):
+    """
+    Converts a whole capture to current in one vectorized pass.
+
+    Parameters:
+    - samples: (N, 5) array of [time, byte1, byte2, byte3, byte4] rows, or a raw
+      byte buffer of 4-byte frames [ADC1 high, ADC1 low, ADC2 high, ADC2 low]
+    - sample_period: Time step used to build the time axis for raw byte buffers
+    - baseline: ADC baseline (defaults to baseline_adc_value)
+
+    Returns:
+    - (times, currents) as NumPy float arrays
+    """
+    if isinstance(samples, (bytes, bytearray, memoryview)):
+        n = len(samples) // BYTES_PER_SAMPLE
+        with stage("conversion", n):
+            words = np.frombuffer(samples, dtype='>u2', count=n * 2).reshape(n, 2)
+            times = np.arange(n, dtype=np.float64) * sample_period
+            adc1 = words[:, 0].astype(np.float64)
+            adc2 = words[:, 1].astype(np.float64)
+            avg = (adc1 + adc2) / 2.0
+            return times, adc_to_current(avg, baseline)
+
+    samples = rows_to_array(samples)
+    with stage("conversion", len(samples)):
+        return samples[:, 0].copy(), convert_frames(samples[:, 1:5], baseline)
+
+def convert_frames(frames, baseline=None):
+    """Converts (N, 4) [byte1, byte2, byte3, byte4] frames to current in A."""
+    raw = np.asarray(frames).astype(np.int64)
+    adc1 = ((raw[:, 0] << 8) | raw[:, 1]).astype(np.float64)
+    adc2 = ((raw[:, 2] << 8) | raw[:, 3]).astype(np.float64)
+    avg = (adc1 + adc2) / 2.0
+    return adc_to_current(avg, baseline)
 
 def detect_and_remove_outliers(data, window=2, threshold=3):
     """
@@ -66,55 +386,50 @@ def detect_and_remove_outliers(data, window=2, threshold=3):
     """
     data_array = np.array(data)
     cleaned_data = data_array.copy()
-    
-    for i in range(window, len(data_array) - window):
-        local_median = np.median(data_array[i - window : i + window + 1])
-        if abs(data_array[i] - local_median) > threshold:
-            cleaned_data[i] = local_median  # Replace outlier with median of neighbors
-    
+
+    span = 2 * window + 1
+    if window < 0 or len(data_array) < span:
+        return cleaned_data.tolist()
+
+    # One row per centre index i in [window, len - window), each holding data[i - window : i + window + 1]
+    windows = np.lib.stride_tricks.sliding_window_view(data_array, span)
+    centre = data_array[window:len(data_array) - window]
+
+    # Median in blocks so wide windows on long captures don't materialize the full N x span copy at once
+    block = max(1, OUTLIER_BLOCK_ELEMENTS // span)
+    for start in range(0, len(windows), block):
+        local_median = np.median(windows[start:start + block], axis=1)
+        values = centre[start:start + block]
+        outliers = np.abs(values - local_median) > threshold
+        # Replace outliers with median of neighbors
+        cleaned_data[window + start:window + start + len(values)][outliers] = local_median[outliers]
+
     return cleaned_data.tolist()
 
-def process_unfiltered_data(data, return_data=False):
-    global baseline_adc_value
-    unfiltered_data = []
-    avg_values = []
-
-    if isinstance(data, str):
-        with open(data, 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader, None)
-            for row in reader:
-                if len(row) >= 5 and all(r.isdigit() for r in row[1:5]):
-                    elapsed_time_ms = float(row[0])
-                    adc1 = (int(row[1]) << 8) | int(row[2])
-                    adc2 = (int(row[3]) << 8) | int(row[4])
-                    avg = (adc1 + adc2) / 2.0
-                    current = map_adc_to_current(avg)
-                    avg_values.append(current)
-                    unfiltered_data.append([elapsed_time_ms / 1000.0, current])
+def process_samples(data, filtered=True, baseline=None):
+    """
+    GUI-free conversion and cleaning of one capture.
 
-    else:
-        for row in data:
-            if len(row) >= 5:
-                elapsed_time = float(row[0])
-                adc1 = (int(row[1]) << 8) | int(row[2])
-                adc2 = (int(row[3]) << 8) | int(row[4])
-                avg = (adc1 + adc2) / 2.0
-                current = map_adc_to_current(avg)
-                avg_values.append(current)
-                unfiltered_data.append([elapsed_time, current])
-
-    print(f"avg_values: {len(avg_values)} items")
+    Parameters:
+    - data: Raw byte capture CSV path, [time, byte1, byte2, byte3, byte4] rows, or a raw byte buffer
+    - filtered: Apply the moving average before outlier removal
+    - baseline: ADC baseline (defaults to baseline_adc_value)
 
-    # Outlier removal only
-    cleaned = detect_and_remove_outliers(avg_values, window=2, threshold=3)
-    cleaned_data = [[unfiltered_data[i][0], val] for i, val in enumerate(cleaned)]
+    Returns:
+    - (times in s, currents in A) as NumPy float arrays
+    """
+    samples = read_raw_csv(data) if isinstance(data, str) else data
+    times, currents = convert_samples(samples, baseline=baseline)
+    log.debug("avg_values: %d items", len(currents))
+    return times, np.asarray(clean_currents(currents, filtered=filtered))
 
+def process_unfiltered_data(data, return_data=False):
+    # Outlier removal only
+    times, cleaned = process_samples(data, filtered=False)
     if return_data:
-        x_data = [row[0] for row in cleaned_data]
-        y_data = [row[1] for row in cleaned_data]
-        return x_data, y_data
+        return times.tolist(), cleaned.tolist()
 
+    from tkinter import filedialog  # Only the interactive save needs Tk
     save_path = filedialog.asksaveasfilename(
         title="Save Unfiltered Data",
         defaultextension=".csv",
@@ -122,13 +437,10 @@ def process_unfiltered_data(data, return_data=False):
     )
 
     if save_path:
-        with open(save_path, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Elapsed Time (s)", "Current (Unfiltered, A)"])
-            writer.writerows(cleaned_data)
-        print(f"Unfiltered data saved to {save_path}.")
+        write_columns_csv(save_path, ["Elapsed Time (s)", "Current (Unfiltered, A)"], [times, cleaned])
+        log.info("Unfiltered data saved to %s.", save_path)
     else:
-        print("Save operation canceled.")
+        log.info("Save operation canceled.")
 
 def moving_average(data, window_size=3):
     """
@@ -146,56 +458,24 @@ def moving_average(data, window_size=3):
     padded = np.pad(data, (window_size//2, window_size-1-window_size//2), mode='edge')
     return np.convolve(padded, np.ones(window_size)/window_size, mode='valid').tolist()
 
-def process_filtered_data(data, return_data=False):
-    global baseline_adc_value
-    avg_values = []
-    filtered_data = []
-
-    if isinstance(data, str):
-        with open(data, 'r') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader, None)
-            for row in reader:
-                if len(row) >= 5 and all(r.isdigit() for r in row[1:5]):
-                    elapsed_time_ms = float(row[0])
-                    adc1 = (int(row[1]) << 8) | int(row[2])
-                    adc2 = (int(row[3]) << 8) | int(row[4])
-                    avg = (adc1 + adc2) / 2.0
-                    mapped_current = map_adc_to_current(avg)
-                    avg_values.append(mapped_current)
-                    filtered_data.append([elapsed_time_ms / 1000.0, mapped_current])
-                    print(f"ADC1 raw: {adc1}, ADC2 raw: {adc2}, Avg: {avg}")
-                    print(f"Mapped current: {mapped_current} A")
-
-    else:
-        for row in data:
-            if len(row) >= 5:
-                try:
-                    elapsed_time = float(row[0])  # Already in seconds
-                    adc1 = (int(row[1]) << 8) | int(row[2])
-                    adc2 = (int(row[3]) << 8) | int(row[4])
-                    avg = (adc1 + adc2) / 2.0
-                    mapped_current = map_adc_to_current(avg)
-                    avg_values.append(mapped_current)
-                    filtered_data.append([elapsed_time, mapped_current])
-                    print(f"ADC1 raw: {adc1}, ADC2 raw: {adc2}, Avg: {avg}")
-                    print(f"Mapped current: {mapped_current} A")
-                except Exception as e:
-                    print(f"Row caused error: {row} → {e}")
-
-    print(f"avg_values: {len(avg_values)} items")
+def clean_currents(currents, filtered=True):
+    """
+    Applies the standard post-processing to converted currents: 3-sample moving
+    average (filtered only) followed by outlier removal.
+    """
+    with stage("filtering", len(currents)):
+        if filtered:
+            currents = moving_average(currents, window_size=3)
+        return detect_and_remove_outliers(currents, window=2, threshold=3)
 
+def process_filtered_data(data, return_data=False):
     # Smoothing and outlier removal
-    smoothed = moving_average(avg_values, window_size=3)
-    cleaned = detect_and_remove_outliers(smoothed, window=2, threshold=3)
-    cleaned_data = [[fd[0], c] for fd, c in zip(filtered_data, cleaned)]
-
+    times, cleaned = process_samples(data, filtered=True)
     if return_data:
-        x_data = [row[0] for row in cleaned_data]
-        y_data = [row[1] for row in cleaned_data]
-        return x_data, y_data
+        return times.tolist(), cleaned.tolist()
 
     # Save to CSV if not returning
+    from tkinter import filedialog  # Only the interactive save needs Tk
     save_path = filedialog.asksaveasfilename(
         title="Save Filtered Data",
         defaultextension=".csv",
@@ -203,13 +483,10 @@ def process_filtered_data(data, return_data=False):
     )
 
     if save_path:
-        with open(save_path, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Elapsed Time (s)", "Average (Filtered)"])
-            writer.writerows(cleaned_data)
-        print(f"Filtered data saved to {save_path}.")
+        write_columns_csv(save_path, ["Elapsed Time (s)", "Average (Filtered)"], [times, cleaned])
+        log.info("Filtered data saved to %s.", save_path)
     else:
-        print("Save operation canceled.")
+        log.info("Save operation canceled.")
 
 
         
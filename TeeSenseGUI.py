@@ -1,14 +1,21 @@
-﻿from PyQt5 import QtCore, QtWidgets
-from PyQt5.QtWidgets import QFileDialog, QMessageBox, QVBoxLayout, QFrame, QComboBox, QLineEdit, QGroupBox, QPushButton, QFormLayout, QLabel, QHBoxLayout, QWidget, QTableWidget, QMainWindow, QPushButton, QApplication
+﻿from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+from PyQt5.QtWidgets import QFileDialog, QMessageBox, QVBoxLayout, QFrame, QComboBox, QLineEdit, QGroupBox, QPushButton, QFormLayout, QLabel, QHBoxLayout, QWidget, QTableWidget, QMainWindow, QPushButton, QApplication, QProgressBar
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
 from matplotlib.lines import Line2D
 from matplotlib.backend_bases import MouseEvent
-from matplotlib.ticker import MultipleLocator
-from csvRead import generate_plot, populate_table
+from matplotlib.ticker import MultipleLocator, AutoLocator
+from csvRead import populate_table, fill_table, load_csv_capture, export_pulse_table
+from captureFile import open_capture, write_capture, CAPTURE_EXTENSION
+from ByteCombine import TriggerEngine, TRIGGER_EDGES, SAMPLE_PERIOD
+from captureLibrary import library
+from diagnostics import configure_logging, diagnostics, get_logger, stage
 import pandas as pd
+import numpy as np
 import json
+import os
 import sys
 import time
 import tkinter as tk
@@ -18,6 +25,8 @@ import importlib
 
 import subprocess
 
+log = get_logger("TeeSenseGUI")
+
 def start_data_collect_window():
     root = tk.Tk()
     root.title("Data Collection Window")
@@ -26,7 +35,7 @@ def start_data_collect_window():
 
     def start_data_collection():
         messagebox.showinfo("Data Collection", "Data collection has started!")
-        print("Data collection has started...")
+        log.info("Data collection has started...")
 
     collect_button = tk.Button(root, text="Start Data Collection", command=start_data_collection)
     collect_button.pack(pady=10)
@@ -60,6 +69,399 @@ class MyMainWindow(QMainWindow):
         ui.MainWindow = self  # Passing reference of the main window to the Ui_MainWindow instance
         ui.closeEvent(event)
 
+class AnalysisWindow(QMainWindow):
+    """Main window that reports when it is closed, so a host application can keep running."""
+    closed = pyqtSignal()
+
+    def closeEvent(self, event):
+        super().closeEvent(event)
+        self.closed.emit()
+
+LOD_POINTS_PER_PIXEL = 2  # Traces longer than this many points per pixel column are min/max decimated
+CAPTURE_FULL_LOAD_SAMPLES = 1_000_000  # .tsc captures up to this length are loaded whole
+CAPTURE_VIEW_SAMPLES = 500_000  # Most samples read from a large .tsc per view; wider ranges are strided
+
+def minmax_decimate(x, y, x_lo, x_hi, n_bins):
+    """
+    Min/max envelope of the samples of a time-sorted trace that fall in [x_lo, x_hi].
+
+    Each of `n_bins` equal-count bins contributes its min and max sample in time order,
+    so narrow spikes survive decimation. Short ranges are returned untouched.
+    """
+    start = max(int(np.searchsorted(x, x_lo, side='left')) - 1, 0)
+    stop = min(int(np.searchsorted(x, x_hi, side='right')) + 1, len(x))
+    n = stop - start
+    n_bins = max(int(n_bins), 1)
+
+    if n <= LOD_POINTS_PER_PIXEL * n_bins:
+        return x[start:stop], y[start:stop]
+
+    per_bin = -(-n // n_bins)
+    whole = (n // per_bin) * per_bin
+    xs = x[start:start + whole].reshape(-1, per_bin)
+    ys = y[start:start + whole].reshape(-1, per_bin)
+
+    i_min = ys.argmin(axis=1)
+    i_max = ys.argmax(axis=1)
+    first = np.minimum(i_min, i_max)
+    second = np.maximum(i_min, i_max)
+    rows = np.arange(len(ys))
+
+    out_x = np.column_stack((xs[rows, first], xs[rows, second])).ravel()
+    out_y = np.column_stack((ys[rows, first], ys[rows, second])).ravel()
+
+    # Leftover samples that don't fill a bin are kept as-is
+    return (np.concatenate((out_x, x[start + whole:stop])),
+            np.concatenate((out_y, y[start + whole:stop])))
+
+class AcquisitionWorker(QObject):
+    """Runs a retake capture on a QThread and reports back to the GUI through signals."""
+    progress = pyqtSignal(int)  # percent complete
+    partial_data = pyqtSignal(dict)  # {"samples": n, "dc_bias": running mean or None}
+    completed = pyqtSignal(object)  # (x_data, y_data, raw frames or None)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, settings, trigger_engine=None, trigger_event=1):
+        super().__init__()
+        self.settings = settings
+        self.trigger_engine = trigger_engine  # Aligns averaged captures
+        self.trigger_event = trigger_event  # Which trigger event (1-based) they are aligned on
+        self.envelope = None  # {"min", "max", "std"} of an averaged retake
+        self._cancel_requested = False
+        self._last_report = 0.0
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def is_cancelled(self):
+        return self._cancel_requested
+
+    def run(self):
+        try:
+            result = self.acquire()
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        if self._cancel_requested:
+            self.cancelled.emit()
+        elif result is None:
+            self.failed.emit("No data collected during retake.")
+        else:
+            self.completed.emit(result)
+
+    def report(self, percent, samples, dc_bias=None, force=False):
+        # Cap signal rate so the GUI thread is never flooded
+        now = time.time()
+        if force or now - self._last_report >= 0.1:
+            self._last_report = now
+            self.progress.emit(percent)
+            self.partial_data.emit({"samples": samples, "dc_bias": dc_bias})
+
+    def acquire(self):
+        import ByteCombine
+        from serialCapture import (open_port, start_capture, capture_samples, capture_triggered,
+                                   iter_frame_chunks, frames_to_rows)
+        from captureFile import new_recording
+
+        port = self.settings.get("port")
+        samples = self.settings.get("samples")
+        filter_mode = self.settings.get("filter_mode")
+        binary = self.settings.get("protocol") == "Binary"
+        trigger = self.settings.get("trigger")
+        averages = max(int(self.settings.get("averages", 1)), 1)
+
+        try:
+            ser = open_port(port)
+        except Exception as e:
+            raise RuntimeError(f"Failed to open port {port}: {e}")
+
+        recorder = new_recording(filter_mode) if self.settings.get("record") else None
+        try:
+            if filter_mode == "DC Bias":
+                log.info("Retaking DC Bias")
+                start_capture(ser, binary)
+                timeout = 60
+                start_time = time.time()
+
+                def on_update(stats):
+                    percent = int(100 * min(1.0, (time.time() - start_time) / timeout))
+                    self.report(percent, stats.count, stats.mean)
+
+                chunks = iter_frame_chunks(ser, timeout, binary, self.is_cancelled)
+                stats = ByteCombine.stream_dc_bias(recorder.tee(chunks) if recorder else chunks, on_update=on_update)
+                if stats.count == 0 or self._cancel_requested:
+                    return None
+                self.report(100, stats.count, stats.mean, force=True)
+                return ByteCombine.dc_bias_trace(stats) + (None,)
+
+            def capture_once(on_progress=None):
+                start_capture(ser, binary)
+                if trigger:
+                    # Waits for the trigger until cancelled; only the window around it is kept
+                    windows = capture_triggered(ser, trigger["level"], trigger["edge"], trigger["pre"],
+                                                trigger["post"], binary=binary, should_stop=self.is_cancelled,
+                                                hysteresis=trigger["hysteresis"])
+                    frames = windows[0] if windows else np.empty((0, 4), dtype=np.uint8)
+                    if recorder:
+                        recorder.write(frames)
+                    return frames
+                # For filtered/unfiltered modes
+                return capture_samples(ser, samples, timeout=5, binary=binary, should_stop=self.is_cancelled,
+                                       on_progress=on_progress, on_frames=recorder.write if recorder else None)
+
+            def process(frames):
+                data = frames_to_rows(frames, start_time=-trigger["pre"] * ByteCombine.SAMPLE_PERIOD if trigger else 0.0)
+                if filter_mode == "Filtered":
+                    return ByteCombine.process_filtered_data(data, return_data=True)
+                return ByteCombine.process_unfiltered_data(data, return_data=True)
+
+            if averages > 1:
+                return self.average_captures(capture_once, process, averages)
+
+            if trigger:
+                log.info("Retaking triggered capture: %s", trigger)
+            frames = capture_once(lambda count: self.report(int(100 * count / samples), count))
+        finally:
+            ser.close()
+            if recorder:
+                path = recorder.close()
+                log.info("Recorded %d samples to %s", recorder.sample_count, path)
+
+        if len(frames) == 0 or self._cancel_requested:
+            return None
+        self.report(100, len(frames), force=True)
+        return process(frames) + (frames,)
+
+    def average_captures(self, capture_once, process, averages):
+        """
+        Runs `averages` captures back to back, aligns each on the selected event
+        of the trigger engine and folds it into a WaveformAverager. Returns
+        (x, mean, None); the envelope is left in self.envelope.
+        """
+        from ByteCombine import WaveformAverager
+
+        log.info("Averaging %d captures", averages)
+        averager = None
+        skipped = 0
+        for _ in range(averages):
+            frames = capture_once()
+            if self._cancel_requested:
+                return None
+            if len(frames) == 0:
+                skipped += 1
+                continue
+
+            x, y = (np.asarray(values, dtype=np.float64) for values in process(frames))
+            trigger_time = 0.0
+            if self.trigger_engine is not None:
+                trigger_time, _ = self.trigger_engine.trigger_time(x, y, self.trigger_event)
+                if trigger_time is None:
+                    skipped += 1  # No trigger in this capture, nothing to align it on
+                    continue
+
+            if averager is None:
+                averager = WaveformAverager(x - trigger_time)
+            averager.add(x, y, trigger_time)
+            self.progress.emit(int(100 * (averager.captures + skipped) / averages))
+            self.partial_data.emit({"samples": len(x), "dc_bias": None,
+                                    "averaged": averager.captures, "averages": averages})
+
+        if averager is None:
+            return None
+        if skipped:
+            log.warning("Skipped %d of %d captures without data or trigger", skipped, averages)
+        x, mean, self.envelope = averager.result()
+        return x, mean, None
+
+class ExportWorker(QObject):
+    """Writes exported columns to disk on a QThread (CSV or NumPy binary)."""
+    progress = pyqtSignal(int)  # percent written
+    completed = pyqtSignal(str)  # file path
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path, header, columns, binary=False):
+        super().__init__()
+        self.file_path = file_path
+        self.header = header
+        self.columns = columns
+        self.binary = binary
+
+    def run(self):
+        from dataExport import write_columns_csv, write_columns_binary
+
+        def on_progress(fraction):
+            self.progress.emit(int(fraction * 100))
+
+        try:
+            if self.binary:
+                write_columns_binary(self.file_path, self.header, self.columns, on_progress=on_progress)
+            else:
+                write_columns_csv(self.file_path, self.header, self.columns, on_progress=on_progress)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.completed.emit(self.file_path)
+
+class DiagnosticsDialog(QtWidgets.QDialog):
+    """Shows per-stage timings and counters collected by the diagnostics module."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.resize(760, 320)
+
+        self.report = QtWidgets.QPlainTextEdit(self)
+        self.report.setReadOnly(True)
+        self.report.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        save_button = QPushButton("Save...")
+        save_button.clicked.connect(self.save)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        for button in (refresh_button, reset_button, save_button):
+            buttons.addWidget(button)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.report)
+        layout.addLayout(buttons)
+
+        # Timings keep accumulating while the dialog is open
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        self.report.setPlainText(diagnostics.format_report())
+
+    def reset(self):
+        diagnostics.reset()
+        self.refresh()
+
+    def save(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Diagnostics", "diagnostics.json", "JSON Files (*.json)")
+        if file_path:
+            try:
+                diagnostics.dump(file_path)
+            except Exception as e:
+                QMessageBox.warning(self, "Error", f"Failed to save diagnostics:\n{e}")
+
+class CaptureLibraryDialog(QtWidgets.QDialog):
+    """
+    Lists the captures kept in the shared library. Checked captures are
+    overlaid on the plot and compared metric by metric with the displayed one.
+    """
+
+    def __init__(self, ui, parent=None):
+        super().__init__(parent)
+        self.ui = ui
+        self.setWindowTitle("Capture Library")
+        self.resize(820, 480)
+
+        self.capture_list = QtWidgets.QListWidget(self)
+        self.capture_list.itemChanged.connect(self.on_item_changed)
+        self.usage_label = QLabel()
+
+        show_button = QPushButton("Show")
+        show_button.setToolTip("Display the selected capture as the main trace")
+        show_button.clicked.connect(self.show_selected)
+        remove_button = QPushButton("Remove")
+        remove_button.clicked.connect(self.remove_selected)
+        clear_button = QPushButton("Clear Overlays")
+        clear_button.clicked.connect(self.clear_overlays)
+
+        self.metrics_table = QTableWidget(self)
+        self.metrics_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.usage_label)
+        buttons.addStretch()
+        for button in (show_button, remove_button, clear_button):
+            buttons.addWidget(button)
+
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Horizontal, self)
+        splitter.addWidget(self.capture_list)
+        splitter.addWidget(self.metrics_table)
+        splitter.setSizes([260, 560])
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(splitter)
+        layout.addLayout(buttons)
+        self.refresh()
+
+    def refresh(self):
+        """Rebuilds the list from the library, keeping overlay check states."""
+        self.capture_list.blockSignals(True)
+        self.capture_list.clear()
+        for entry in reversed(list(library)):
+            current = " (displayed)" if entry.key == self.ui.current_entry_key else ""
+            item = QtWidgets.QListWidgetItem(f"{entry.name}{current} - {entry.length:,} samples")
+            item.setData(QtCore.Qt.UserRole, entry.key)
+            item.setFlags(item.flags() | QtCore.Qt.ItemIsUserCheckable)
+            item.setCheckState(QtCore.Qt.Checked if entry.key in self.ui.overlay_keys else QtCore.Qt.Unchecked)
+            self.capture_list.addItem(item)
+        self.capture_list.blockSignals(False)
+
+        self.usage_label.setText(f"{len(library)} captures, {library.total_bytes / 1e6:.1f} MB "
+                                 f"of {library.budget_bytes / 1e6:.0f} MB")
+        self.refresh_metrics()
+
+    def refresh_metrics(self):
+        """One column per compared capture (displayed first), one row per parameter."""
+        keys = [self.ui.current_entry_key] + sorted(self.ui.overlay_keys - {self.ui.current_entry_key})
+        entries = [entry for entry in (library.get(key) for key in keys if key is not None) if entry is not None]
+        columns = [(entry.name, entry.analysis()[0] or {}) for entry in entries]
+
+        parameters = []
+        for _, stats in columns:
+            parameters.extend(name for name in stats if name not in parameters)
+
+        self.metrics_table.clear()
+        self.metrics_table.setRowCount(len(parameters))
+        self.metrics_table.setColumnCount(len(columns))
+        self.metrics_table.setHorizontalHeaderLabels([name for name, _ in columns])
+        self.metrics_table.setVerticalHeaderLabels(parameters)
+        for column, (_, stats) in enumerate(columns):
+            for row, parameter in enumerate(parameters):
+                self.metrics_table.setItem(row, column, QtWidgets.QTableWidgetItem(stats.get(parameter, "-")))
+        self.metrics_table.resizeColumnsToContents()
+
+    def checked_keys(self):
+        return {self.capture_list.item(i).data(QtCore.Qt.UserRole) for i in range(self.capture_list.count())
+                if self.capture_list.item(i).checkState() == QtCore.Qt.Checked}
+
+    def selected_key(self):
+        item = self.capture_list.currentItem()
+        return item.data(QtCore.Qt.UserRole) if item is not None else None
+
+    def on_item_changed(self, item):
+        self.ui.set_overlays(self.checked_keys())
+        self.refresh_metrics()
+
+    def show_selected(self):
+        key = self.selected_key()
+        if key is not None:
+            self.ui.show_library_entry(key)
+            self.refresh()
+
+    def remove_selected(self):
+        key = self.selected_key()
+        if key is not None:
+            library.remove(key)
+            self.ui.set_overlays(self.ui.overlay_keys - {key})
+            self.refresh()
+
+    def clear_overlays(self):
+        self.ui.set_overlays(set())
+        self.refresh()
+
 class Ui_MainWindow(object):
 
     def closeEvent(self, event):
@@ -69,7 +471,7 @@ class Ui_MainWindow(object):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            print("PyQt5 window closed, exiting program...")
+            log.info("PyQt5 window closed, exiting program...")
 
             # Close the Tkinter window if it's open
             if root:
@@ -82,6 +484,12 @@ class Ui_MainWindow(object):
             event.ignore()  # Ignore the close event and keep the window open
 
     def open_data_collect_window(self):
+        if self.show_data_collect is not None:
+            # Hosted by dataCollect: its logger window lives in this process, keep this one for the next capture
+            self.MainWindow.hide()
+            self.show_data_collect()
+            return
+
         # Ensure we are closing the MainWindow correctly
         self.MainWindow.close()  # Close the current window
 
@@ -93,107 +501,95 @@ class Ui_MainWindow(object):
             QMessageBox.warning(None, "Missing Settings", "No previous measurement settings found.")
             return
 
+        if getattr(self, 'acq_thread', None) is not None:
+            return  # A retake is already running
+
         settings = self.retake_settings
-        port = settings.get("port")
-        samples = settings.get("samples")
-        filter_mode = settings.get("filter_mode")
 
-        if not port:
+        if not settings or not settings.get("port"):
             QMessageBox.warning(None, "Invalid Settings", "Measurement settings are incomplete.")
             return
 
-        try:
-            import serial
-            ser = serial.Serial(port, 115200, timeout=1)
-            ser.flushInput()
-        except Exception as e:
-            QMessageBox.critical(None, "Serial Error", f"Failed to open port {port}: {e}")
-            return
-
-        ser.write(b'RESET\n')
-        time.sleep(0.5)
-        ser.reset_input_buffer()
-
-        if filter_mode == "DC Bias":
-            # DC Bias specific logic
-            try:
-                print("Retaking DC Bias")
-                samples = []
-                skip_first = True
-                start_time = time.time()
-                timeout = 60
-
-                while time.time() - start_time < timeout:
-                    if ser.in_waiting:
-                        line = ser.readline().decode('utf-8').strip()
-                        try:
-                            parts = list(map(int, line.split()))
-                            if skip_first:
-                                print(f"Skipping first timing line: {parts}")
-                                skip_first = False
-                                continue
-                            if len(parts) == 4:
-                                samples.append(parts)
-                        except:
-                            continue
-                    else:
-                        time.sleep(0.001)
-
-                ser.close()
-
-                if not samples:
-                    QMessageBox.warning(None, "Error", "No data collected during DC Bias retake.")
-                    return
-
-                sample_interval = 1 / 1_220_000
-                formatted = [[i * sample_interval] + row for i, row in enumerate(samples)]
-
-                from ByteCombine import process_dc_bias_data
-                x_data, y_data = process_dc_bias_data(formatted, return_data=True)
-                self.retake_button.setEnabled(True)
-                self.load_direct_data(x_data, y_data, filtered=False, retake_settings=settings)
-
-
-            except Exception as e:
-                QMessageBox.critical(None, "Retake Error", f"DC Bias retake failed:\n{e}")
-            return
-
-        # For filtered/unfiltered modes
-        data = []
-        sample_interval = 1 / 1_220_000
-        sample_index = 0
-        skip_first = True
-        start_time = time.time()
-        timeout = 5
-
-        while len(data) < samples and (time.time() - start_time < timeout):
-            if ser.in_waiting:
-                line = ser.readline().decode('utf-8').strip()
-                try:
-                    parts = list(map(int, line.split()))
-                    if skip_first:
-                        print(f"⚠️ Skipping first timing line: {parts}")
-                        skip_first = False
-                        continue
-                    if len(parts) == 4:
-                        data.append([sample_index * sample_interval] + parts)
-                        sample_index += 1
-                except:
-                    continue
-            else:
-                time.sleep(0.001)
-
-        ser.close()
-
-        from ByteCombine import process_filtered_data, process_unfiltered_data
-        if filter_mode == "Filtered":
-            x_data, y_data = process_filtered_data(data, return_data=True)
+        if settings.get("trigger"):
+            # A triggered retake fires on the trigger currently set in Graph Controls
+            engine = self.trigger_engine()
+            if engine is not None:
+                settings = dict(settings, trigger=dict(settings["trigger"], level=engine.level, edge=engine.edge,
+                                                       hysteresis=engine.hysteresis))
+
+        settings = dict(settings, averages=self.average_input.value())
+
+        self.acq_thread = QThread()
+        # Retakes are not captured yet; their samples arrive at the acquisition sample period
+        self.acq_worker = AcquisitionWorker(settings, self.trigger_engine(sample_period=SAMPLE_PERIOD),
+                                            self.trigger_event())
+        self.acq_worker.moveToThread(self.acq_thread)
+
+        self.acq_thread.started.connect(self.acq_worker.run)
+        self.acq_worker.progress.connect(self.progress_bar.setValue)
+        self.acq_worker.partial_data.connect(self.on_acquisition_partial_data)
+        self.acq_worker.completed.connect(self.on_acquisition_completed)
+        self.acq_worker.failed.connect(self.on_acquisition_failed)
+        self.acq_worker.cancelled.connect(self.on_acquisition_cancelled)
+        for signal in (self.acq_worker.completed, self.acq_worker.failed, self.acq_worker.cancelled):
+            signal.connect(self.acq_thread.quit)
+        self.acq_thread.finished.connect(self.acq_worker.deleteLater)
+        self.acq_thread.finished.connect(self.acq_thread.deleteLater)
+        self.acq_thread.finished.connect(self.on_acquisition_thread_finished)
+
+        self.retake_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.setVisible(True)
+        self.statusbar.showMessage("Retaking measurement...")
+
+        self.acq_thread.start()
+
+    def cancel_measurement(self):
+        if getattr(self, 'acq_worker', None) is not None:
+            self.cancel_button.setEnabled(False)
+            self.statusbar.showMessage("Cancelling measurement...")
+            self.acq_worker.cancel()
+
+    def on_acquisition_partial_data(self, info):
+        if info.get("averaged") is not None:
+            self.statusbar.showMessage(f"Averaged {info['averaged']} of {info['averages']} captures")
+        elif info.get("dc_bias") is not None:
+            self.statusbar.showMessage(f"DC Bias: {info['dc_bias']:.6f} A ({info['samples']} samples)")
         else:
-            x_data, y_data = process_unfiltered_data(data, return_data=True)
-
-        self.load_direct_data(x_data, y_data, filtered=(filter_mode == "Filtered"), retake_settings=settings)
+            self.statusbar.showMessage(f"Received {info['samples']} samples")
+
+    def on_acquisition_completed(self, result):
+        settings = self.acq_worker.settings
+        envelope = self.acq_worker.envelope
+        self.finish_acquisition()
+        x_data, y_data, frames = result
+        self.load_direct_data(x_data, y_data, filtered=(settings.get("filter_mode") == "Filtered"),
+                              retake_settings=settings, raw_frames=frames, envelope=envelope)
+        if envelope is not None:
+            self.set_raw_frames(None)  # An average has no single raw capture to save
+        self.statusbar.showMessage("Measurement complete", 5000)
+
+    def on_acquisition_failed(self, message):
+        self.finish_acquisition()
+        self.statusbar.clearMessage()
+        QMessageBox.critical(None, "Retake Error", f"Retake failed:\n{message}")
+
+    def on_acquisition_cancelled(self):
+        self.finish_acquisition()
+        self.statusbar.showMessage("Measurement cancelled", 5000)
+
+    def finish_acquisition(self):
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
         self.retake_button.setEnabled(True)
 
+    def on_acquisition_thread_finished(self):
+        # Drop references only once the thread has actually stopped
+        self.acq_thread = None
+        self.acq_worker = None
+
     def on_pick(self, event):
         for marker in self.markers:
             if marker.line == event.artist:
@@ -345,8 +741,14 @@ class Ui_MainWindow(object):
         self.last_y_data = y_data
         self.current_file_path = None  # to signal in-memory mode
 
-    def load_direct_data(self, x_data, y_data, filtered=False, retake_settings=None):
+    def load_direct_data(self, x_data, y_data, filtered=False, retake_settings=None, raw_frames=None, envelope=None,
+                         name=None, source=None, remember=True, capture_view=None):
         self.reference_trigger_time = None
+        self.envelope = envelope
+        self.capture_view = capture_view
+        # Raw ADC frames of this capture, kept for saving as a .tsc capture file (None clears stale ones)
+        import ByteCombine
+        self.set_raw_frames(raw_frames, "Filtered" if filtered else "Unfiltered", ByteCombine.baseline_adc_value)
         self.x_unit = self.unit_selector_x.currentText()
         self.y_unit = self.unit_selector_y.currentText()
 
@@ -357,40 +759,28 @@ class Ui_MainWindow(object):
         self.last_y_data = y_data
         self.current_file_path = None
 
-        populate_table(self.tableWidget, pd.DataFrame({
+        stats, self.pulse_table = populate_table(self.tableWidget, pd.DataFrame({
             "Time": x_data,
             "Current": y_data
         }))
+        if remember:
+            # The library entry reuses these metrics instead of computing them again
+            self.remember_capture(name or f"Acquisition {time.strftime('%H:%M:%S')}", x_data, y_data, source,
+                                  analysis=(stats, self.pulse_table))
 
-        # Auto-detect trigger threshold if needed
-        threshold = None
-        try:
-            threshold = float(self.trigger_threshold.text())
-        except:
-            pass
-
-        trigger_index = 0
-        if threshold is not None:
-            for i in range(1, len(y_data)):
-                if y_data[i - 1] < threshold <= y_data[i]:
-                    trigger_index = i
-                    break
-
-        trigger_time = x_data[trigger_index]
-        aligned_x = [x - trigger_time for x in x_data]
-
-        print(f"Trigger threshold: {threshold}")
-        print(f"Trigger index: {trigger_index}")
-        print(f"Trigger time: {trigger_time}")
-        print(f"First aligned x: {aligned_x[0]:.6f}, Last: {aligned_x[-1]:.6f}")
+        x_data = np.asarray(x_data, dtype=np.float64)
+        trigger_time = self.find_trigger_time(x_data, y_data)
+        aligned_x = x_data - trigger_time
+        log.debug("First aligned x: %.6f, Last: %.6f", aligned_x[0], aligned_x[-1])
 
         self.prepare_and_display_data(aligned_x, y_data)
+        self.set_trigger_source(x_data, y_data, trigger_time)
         self.is_unsaved = True
 
          # Store settings if provided
         if retake_settings:
             self.retake_settings = retake_settings
-            print("Retake settings received:", self.retake_settings)
+            log.debug("Retake settings received: %s", self.retake_settings)
         else:
             # Only disable if not previously set
             if not hasattr(self, 'retake_settings'):
@@ -404,6 +794,7 @@ class Ui_MainWindow(object):
         MainWindow.setObjectName("MainWindow")
         MainWindow.resize(1200, 700)
         self.MainWindow = MainWindow  # Store reference to the MainWindow
+        self.show_data_collect = None  # Set by a host application that owns the data collect window
         self.markers = []
         self.marker_counter = 1
         self.marker_placement_enabled = False
@@ -424,6 +815,24 @@ class Ui_MainWindow(object):
 
         self.reference_trigger_time = None
 
+        self.plot_x = None
+        self.plot_y = None
+        self.plot_x_scale = 1
+        self.plot_y_scale = 1
+        self.pulse_table = None
+        self.raw_frames = None
+        self.raw_filter_mode = "Unfiltered"
+        self.raw_baseline = None
+        self.trace_line = None
+        self.trace_decimated = False
+        self.capture_view = None  # Large .tsc shown from an overview; zooming reads the visible range
+        self.envelope = None  # {"min", "max", "std"} arrays of an averaged trace
+        self.envelope_artists = []
+        self.current_entry_key = None  # Library entry of the displayed capture
+        self.overlay_keys = set()  # Library entries overlaid on the plot
+        self.overlay_artists = []
+        self.library_dialog = None
+
         self.centralwidget = QtWidgets.QWidget(MainWindow)
         self.main_layout = QtWidgets.QHBoxLayout(self.centralwidget)
 
@@ -515,16 +924,53 @@ class Ui_MainWindow(object):
 
         self.trigger_threshold = QLineEdit()
         self.trigger_threshold.setPlaceholderText("e.g. 0.01 A")
+        self.trigger_edge = QComboBox()
+        self.trigger_edge.addItems(TRIGGER_EDGES)
+        self.trigger_hysteresis = QLineEdit(); self.trigger_hysteresis.setPlaceholderText("Optional, A")
+        self.trigger_holdoff = QLineEdit(); self.trigger_holdoff.setPlaceholderText("Optional, s")
+        self.trigger_event_input = QLineEdit(); self.trigger_event_input.setPlaceholderText("1")
+        self.trigger_source = None
 
         self.apply_btn = QPushButton("Apply")
         self.apply_btn.clicked.connect(self.apply_axis_settings)
 
         # --- Retake Button ---
+        self.average_input = QtWidgets.QSpinBox()
+        self.average_input.setRange(1, 10000)
+        self.average_input.setPrefix("Average ")
+        self.average_input.setSuffix(" capture(s)")
+        self.average_input.setToolTip("Retake runs this many captures back to back and plots their trigger-aligned mean")
+        self.rightLayout.addWidget(self.average_input)
+
         self.retake_button = QPushButton("Retake Measurement")
         self.retake_button.setEnabled(False)  # Initially disabled until settings exist
         self.retake_button.clicked.connect(self.retake_measurement)
         self.rightLayout.addWidget(self.retake_button)
 
+        # --- Retake Progress / Cancel (shown while a capture runs) ---
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        self.rightLayout.addWidget(self.progress_bar)
+
+        self.cancel_button = QPushButton("Cancel Measurement")
+        self.cancel_button.clicked.connect(self.cancel_measurement)
+        self.cancel_button.setVisible(False)
+        self.rightLayout.addWidget(self.cancel_button)
+
+        self.acq_thread = None
+        self.acq_worker = None
+
+        # --- Export Progress (separate, so an export and a retake can run together) ---
+        self.export_progress_bar = QProgressBar()
+        self.export_progress_bar.setRange(0, 100)
+        self.export_progress_bar.setFormat("Exporting %p%")
+        self.export_progress_bar.setVisible(False)
+        self.rightLayout.addWidget(self.export_progress_bar)
+
+        self.export_thread = None
+        self.export_worker = None
+
         # --- Open Data Collect Window Button ---
         self.open_button = QPushButton("Open Data Collect Window", self.centralwidget)
         self.open_button.clicked.connect(self.open_data_collect_window)
@@ -540,6 +986,10 @@ class Ui_MainWindow(object):
         self.controlLayout.addRow("Y min:", self.input_y_min)
         self.controlLayout.addRow("Y max:", self.input_y_max)
         self.controlLayout.addRow("Trigger Threshold:", self.trigger_threshold)
+        self.controlLayout.addRow("Trigger Edge:", self.trigger_edge)
+        self.controlLayout.addRow("Hysteresis:", self.trigger_hysteresis)
+        self.controlLayout.addRow("Holdoff:", self.trigger_holdoff)
+        self.controlLayout.addRow("Trigger Event #:", self.trigger_event_input)
         self.controlLayout.addRow(self.apply_btn)
 
         self.rightLayout.addWidget(self.controlGroup)
@@ -554,6 +1004,14 @@ class Ui_MainWindow(object):
         self.actionOpen.triggered.connect(self.handle_open_action)
         self.menuFile.addAction(self.actionOpen)
         self.menubar.addMenu(self.menuFile)
+        self.menuTools = QtWidgets.QMenu(self.menubar)
+        self.actionDiagnostics = QtWidgets.QAction("Diagnostics")
+        self.actionDiagnostics.triggered.connect(self.show_diagnostics)
+        self.menuTools.addAction(self.actionDiagnostics)
+        self.actionLibrary = QtWidgets.QAction("Capture Library")
+        self.actionLibrary.triggered.connect(self.show_library)
+        self.menuTools.addAction(self.actionLibrary)
+        self.menubar.addMenu(self.menuTools)
         MainWindow.setMenuBar(self.menubar)
 
         # ========== Status Bar ==========
@@ -609,39 +1067,100 @@ class Ui_MainWindow(object):
 
 
     def export_csv(self):
-        if not hasattr(self, "last_x_data") or not hasattr(self, "last_y_data"):
+        if getattr(self, "last_x_data", None) is None or getattr(self, "last_y_data", None) is None:
             QMessageBox.warning(None, "No Data", "No data to export. Please load a file first.")
             return
 
-        file_path, _ = QFileDialog.getSaveFileName(
-            None, "Save CSV", "", "CSV Files (*.csv)"
+        if getattr(self, "export_thread", None) is not None:
+            QMessageBox.information(None, "Export Running", "An export is already in progress.")
+            return
+
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            None, "Save CSV", "", "CSV Files (*.csv);;NumPy Binary (*.npy)"
         )
         if not file_path:
             return
 
+        binary = file_path.endswith(".npy") or "npy" in selected_filter
+        if binary and not file_path.endswith(".npy"):
+            file_path += ".npy"
+
         x_scale = self.unit_scale_x.get(self.x_unit, 1)
         y_scale = self.unit_scale_y.get(self.y_unit, 1)
+        columns = [np.asarray(self.last_x_data, dtype=np.float64) * x_scale,
+                   np.asarray(self.last_y_data, dtype=np.float64) * y_scale]
+        header = [f"Time ({self.x_unit})", f"Current ({self.y_unit})"]
+
+        self.export_thread = QThread()
+        self.export_worker = ExportWorker(file_path, header, columns, binary)
+        self.export_worker.moveToThread(self.export_thread)
+
+        self.export_thread.started.connect(self.export_worker.run)
+        self.export_worker.progress.connect(self.export_progress_bar.setValue)
+        self.export_worker.completed.connect(self.on_export_completed)
+        self.export_worker.failed.connect(self.on_export_failed)
+        for signal in (self.export_worker.completed, self.export_worker.failed):
+            signal.connect(self.export_thread.quit)
+        self.export_thread.finished.connect(self.export_worker.deleteLater)
+        self.export_thread.finished.connect(self.export_thread.deleteLater)
+        self.export_thread.finished.connect(self.on_export_thread_finished)
+
+        self.export_progress_bar.setValue(0)
+        self.export_progress_bar.setVisible(True)
+        self.statusbar.showMessage(f"Exporting {len(columns[0])} points...")
+        self.export_thread.start()
+
+    def on_export_completed(self, file_path):
+        self.export_progress_bar.setVisible(False)
+        self.statusbar.showMessage(f"Saved {file_path}", 5000)
+        QMessageBox.information(None, "Success", "CSV file saved successfully.")
+
+    def on_export_failed(self, message):
+        self.export_progress_bar.setVisible(False)
+        self.statusbar.clearMessage()
+        QMessageBox.warning(None, "Error", f"Failed to save CSV:\n{message}")
+
+    def on_export_thread_finished(self):
+        self.export_thread = None
+        self.export_worker = None
+
+    def export_pulse_statistics(self):
+        pulses = getattr(self, "pulse_table", None)
+        if pulses is None or pulses.empty:
+            QMessageBox.warning(None, "No Pulses", "No complete pulses were found in the current data.")
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(
+            None, "Save Pulse Table", "", "CSV Files (*.csv)"
+        )
+        if not file_path:
+            return
 
         try:
-            with open(file_path, "w", newline="") as f:
-                f.write(f"Time ({self.x_unit}),Current ({self.y_unit})\n")
-                for x, y in zip(self.last_x_data, self.last_y_data):
-                    f.write(f"{x * x_scale},{y * y_scale}\n")
-            QMessageBox.information(None, "Success", "CSV file saved successfully.")
+            summary_path = export_pulse_table(pulses, file_path)
+            QMessageBox.information(None, "Success", f"Saved {len(pulses)} pulses and summary:\n{summary_path}")
         except Exception as e:
-            QMessageBox.warning(None, "Error", f"Failed to save CSV:\n{e}")
+            QMessageBox.warning(None, "Error", f"Failed to save pulse table:\n{e}")
 
     def retranslateUi(self, MainWindow):
         _translate = QtCore.QCoreApplication.translate
         MainWindow.setWindowTitle(_translate("MainWindow", "TeeSense Current Pulse Display"))
         self.menuFile.setTitle(_translate("MainWindow", "&File"))
+        self.menuTools.setTitle(_translate("MainWindow", "&Tools"))
         self.actionOpen.setText(_translate("MainWindow", "Open"))
         self.actionExportCSV = QtWidgets.QAction("Export Data as CSV")
         self.menuFile.addAction(self.actionExportCSV)
         self.actionExportCSV.triggered.connect(self.export_csv)
+        self.actionSaveCapture = QtWidgets.QAction("Save Raw Capture (.tsc)")
+        self.menuFile.addAction(self.actionSaveCapture)
+        self.actionSaveCapture.triggered.connect(self.save_capture_file)
+        self.actionSaveCapture.setEnabled(self.raw_frames is not None)
+        self.actionExportPulses = QtWidgets.QAction("Export Pulse Statistics")
+        self.menuFile.addAction(self.actionExportPulses)
+        self.actionExportPulses.triggered.connect(self.export_pulse_statistics)
 
     def apply_axis_settings(self):
-        print("apply_axis_settings called")
+        log.debug("apply_axis_settings called")
 
         self.y_unit = self.unit_selector_y.currentText()
         self.x_unit = self.unit_selector_x.currentText()
@@ -664,8 +1183,14 @@ class Ui_MainWindow(object):
         try: self.y_max = float(self.input_y_max.text().strip())
         except: self.y_max = None
 
-        print(f"🧪 Parsed X min/max: {self.x_min}, {self.x_max}")
-        print(f"🧪 Parsed Y min/max: {self.y_min}, {self.y_max}")
+        log.debug("Parsed X min/max: %s, %s", self.x_min, self.x_max)
+        log.debug("Parsed Y min/max: %s, %s", self.y_min, self.y_max)
+
+        # Only units/limits/ticks changed → update the existing plot in place
+        if self.can_update_incrementally():
+            log.debug("Updating axes in place...")
+            self.update_axes_incremental()
+            return
 
         self.locked_xlim = None
         self.locked_ylim = None
@@ -674,66 +1199,142 @@ class Ui_MainWindow(object):
         # Prioritize .csv file if loaded
         if self.current_file_path:
             if self.current_file_path.endswith('.csv'):
-                print("Re-opening .csv file...")
+                log.debug("Re-opening .csv file...")
                 self.open_excel_file(self.current_file_path)
             else:
-                print("current_file_path is set but not a .csv — skipping.")
+                log.debug("current_file_path is set but not a .csv — skipping.")
         elif self.last_x_data is not None and self.last_y_data is not None:
-            print("Re-triggering and redrawing direct-loaded data...")
-            self.load_direct_data(self.last_x_data, self.last_y_data, )
+            log.debug("Re-triggering and redrawing direct-loaded data...")
+            # Same capture re-triggered: keep its raw frames for Save Raw Capture
+            raw = (self.raw_frames, self.raw_filter_mode, self.raw_baseline)
+            self.load_direct_data(self.last_x_data, self.last_y_data, envelope=self.envelope, remember=False,
+                                  capture_view=self.capture_view)
+            self.set_raw_frames(*raw)
         else:
-            print("No data source available — nothing to update.")
+            log.debug("No data source available — nothing to update.")
 
         self.canvas.draw_idle() 
 
+    def show_diagnostics(self):
+        """Opens (or raises) the stage timing panel."""
+        if getattr(self, 'diagnostics_dialog', None) is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self.centralwidget.window())
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+
     def handle_open_action(self):
-        file_path, _ = QFileDialog.getOpenFileName(None, "Open File", "", "CSV Files (*.csv);;JSON Files (*.json)")
+        file_path, _ = QFileDialog.getOpenFileName(None, "Open File", "", "CSV Files (*.csv);;TeeSense Captures (*.tsc);;JSON Files (*.json)")
         if file_path:
-            self.current_file_path = file_path
             if file_path.endswith('.csv'):
+                self.current_file_path = file_path
                 self.open_excel_file(file_path)
+            elif file_path.endswith(CAPTURE_EXTENSION):
+                self.open_capture_file(file_path)
             else:
                 QMessageBox.warning(None, "Error", "Unsupported file type.")
 
+    def open_capture_file(self, file_path):
+        """
+        Opens a memory-mapped .tsc capture and reapplies its stored processing.
+        Large captures show a strided overview (the table is measured on it) and
+        only the visible range is read from disk when the view is zoomed or panned.
+        DC Bias recordings are streamed into their bias value.
+        """
+        try:
+            from ByteCombine import clean_currents, stream_dc_bias, dc_bias_trace
+            capture = open_capture(file_path)
+            if len(capture) == 0:
+                raise ValueError("Capture contains no samples.")
+            name = os.path.basename(file_path)
+
+            if capture.filter_mode == "DC Bias":
+                stats = stream_dc_bias(capture.iter_frames(), baseline=capture.baseline)
+                x_data, y_data = dc_bias_trace(stats, capture.sample_period)
+                self.load_direct_data(np.asarray(x_data), np.asarray(y_data), name=name, source=file_path)
+                self.statusbar.showMessage(f"DC Bias: {stats.mean:.6f} A over {stats.count} samples "
+                                           f"(std {stats.std:.6f} A)")
+            elif len(capture) <= CAPTURE_FULL_LOAD_SAMPLES:
+                filtered = capture.filter_mode == "Filtered"
+                x_data = capture.times()
+                y_data = np.asarray(clean_currents(capture.currents(), filtered=filtered))
+                self.load_direct_data(x_data, y_data, filtered=filtered, name=name, source=file_path)
+            else:
+                view = {"capture": capture, "filtered": capture.filter_mode == "Filtered"}
+                x_data, y_data = self.read_capture_view(view, 0, len(capture))
+                self.load_direct_data(x_data, y_data, filtered=view["filtered"], name=name, source=file_path,
+                                      capture_view=view)
+                self.statusbar.showMessage(f"Overview of {len(x_data)} of {len(capture)} samples; "
+                                           f"zoom in for full resolution")
+
+            # Re-saving writes the mapped words straight back out
+            self.set_raw_frames(capture.words, capture.filter_mode, capture.baseline)
+        except Exception as e:
+            QMessageBox.warning(None, "Error", f"Could not load capture file:\n{e}")
+
+    def set_raw_frames(self, frames, filter_mode="Unfiltered", baseline=None):
+        """Raw ADC frames behind the displayed trace, or None; Save Raw Capture is only enabled with frames."""
+        self.raw_frames = frames
+        self.raw_filter_mode = filter_mode
+        self.raw_baseline = baseline
+        if hasattr(self, 'actionSaveCapture'):
+            self.actionSaveCapture.setEnabled(frames is not None)
+
+    def save_capture_file(self):
+        if self.raw_frames is None:
+            QMessageBox.warning(None, "No Raw Data", "Only fresh acquisitions can be saved as raw captures.")
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(
+            None, "Save Capture", "", f"TeeSense Captures (*{CAPTURE_EXTENSION})"
+        )
+        if not file_path:
+            return
+        if not file_path.endswith(CAPTURE_EXTENSION):
+            file_path += CAPTURE_EXTENSION
+
+        try:
+            if isinstance(self.raw_frames, np.memmap) and \
+                    os.path.abspath(self.raw_frames.filename) == os.path.abspath(file_path):
+                # Saving over the open capture: release its mapping first (Windows can't replace a mapped file)
+                self.raw_frames = np.array(self.raw_frames)
+            write_capture(file_path, self.raw_frames, baseline=self.raw_baseline, filter_mode=self.raw_filter_mode)
+            QMessageBox.information(None, "Success", "Capture saved successfully.")
+        except Exception as e:
+            QMessageBox.warning(None, "Error", f"Failed to save capture:\n{e}")
+
     def open_excel_file(self, file_path):
         try:
             self.x_unit = self.unit_selector_x.currentText()
             self.y_unit = self.unit_selector_y.currentText()
-            data = pd.read_csv(file_path)
-            populate_table(self.tableWidget, data)
+            # Parsed once per file version; re-opening or re-applying reuses the cached arrays and stats
+            capture = load_csv_capture(file_path)
+            stats, self.pulse_table = capture.analysis()
+            self.remember_capture(os.path.basename(file_path), capture.time, capture.display_current, file_path,
+                                  analysis=(stats, self.pulse_table))
+            if not stats:
+                QMessageBox.warning(None, "Error", "No numerical data found in the file.")
+            else:
+                fill_table(self.tableWidget, stats)
+            self.set_raw_frames(None)  # CSV holds processed currents only
+            self.envelope = None
+            self.capture_view = None
             
             self.locked_ylim = None 
            
-            raw_x, raw_y = generate_plot(file_path, return_raw=True)
-
-         
-            try:
-                threshold = float(self.trigger_threshold.text())
-            except:
-                threshold = None
-
-            
-            trigger_index = 0
-            if threshold is not None:
-                for i in range(1, len(raw_y)):
-                    if raw_y[i - 1] < threshold <= raw_y[i]:
-                        trigger_index = i
-                        break
+            raw_x, raw_y = capture.time, capture.display_current
 
-            trigger_time = raw_x[trigger_index]
+            trigger_time = self.find_trigger_time(raw_x, raw_y)
 
             
             if self.reference_trigger_time is None:
                 self.reference_trigger_time = 0
 
             
-            aligned_x = [x - trigger_time for x in raw_x]
+            aligned_x = raw_x - trigger_time
             
-            print(f"x_unit: {self.x_unit}")
-            print(f"x_scale: {self.unit_scale_x.get(self.x_unit, 1)}")
-            print(f"x range (raw): {min(raw_x)} to {max(raw_x)}")
-            print(f"x range (scaled): {[min(raw_x)*self.unit_scale_x.get(self.x_unit,1), max(raw_x)*self.unit_scale_x.get(self.x_unit,1)]}")
+            log.debug("x_unit: %s, x_scale: %s", self.x_unit, self.unit_scale_x.get(self.x_unit, 1))
             self.display_raw_data(aligned_x, raw_y)
+            self.set_trigger_source(raw_x, raw_y, trigger_time)
             self.is_unsaved = True
 
         except Exception as e:
@@ -741,24 +1342,215 @@ class Ui_MainWindow(object):
 
 
     def display_raw_data(self, x_data, y_data):
-        self.figure.clear()
-        self.ax = self.figure.add_subplot(111)
-        self.ax.set_title("Current Pulse Data")
+        with stage("render", len(x_data)):
+            self.figure.clear()
+            self.ax = self.figure.add_subplot(111)
+            self.ax.set_title("Current Pulse Data")
+
+            self.last_x_data = x_data
+            self.last_y_data = y_data
+
+            x_scale = self.unit_scale_x.get(self.x_unit, 1)
+            y_scale = self.unit_scale_y.get(self.y_unit, 1)
+            x = np.asarray(x_data, dtype=np.float64) * x_scale
+            y = np.asarray(y_data, dtype=np.float64) * y_scale
+
+            # Full-resolution trace kept for level-of-detail refinement on zoom
+            self.plot_x = x
+            self.plot_y = y
+            self.plot_x_scale = x_scale
+            self.plot_y_scale = y_scale
+            self.trigger_source = None  # Set by callers that aligned this trace on a trigger
+
+            if len(x) > LOD_POINTS_PER_PIXEL * self.lod_pixel_width():
+                plot_x, plot_y = minmax_decimate(x, y, x[0], x[-1], self.lod_pixel_width())
+                self.trace_line, = self.ax.plot(plot_x, plot_y, label="Pulse", linestyle='-')
+                self.trace_decimated = True
+            else:
+                self.trace_line, = self.ax.plot(x, y, label="Pulse", linestyle='-', marker='o')
+                self.trace_decimated = False
+            self.ax.set_xlabel(f"Time ({self.x_unit})")
+            self.ax.set_ylabel(f"Current ({self.y_unit})")
+            self.ax.grid(True)
+            self.envelope_artists = []
+            self.overlay_artists = []
+            self.draw_envelope()
+            self.draw_overlays()
+            self.ax.legend()
+
+            self.apply_axis_limits(x, y)
+
+            # --- Redraw Markers on Fresh Axes ---
+            new_markers = []
+            for old_marker in self.markers:
+                m = InteractiveMarker(self.ax, old_marker.orientation, old_marker.position, old_marker.label)
+                new_markers.append(m)
+            self.markers = new_markers
+
+            # Reconnect click handler to new canvas/axes
+            self.canvas.mpl_disconnect(getattr(self, '_marker_click_cid', None))
+            self._marker_click_cid = self.canvas.mpl_connect("button_press_event", self.on_click)
+            self.canvas.mpl_disconnect(getattr(self, "_click_cid", None))
+            self.canvas.mpl_disconnect(getattr(self, "_release_cid", None))
+            self.canvas.mpl_disconnect(getattr(self, "_motion_cid", None))
+
+            self._click_cid = self.canvas.mpl_connect("button_press_event", self.on_click)
+            self._release_cid = self.canvas.mpl_connect("button_release_event", self.on_release)
+            self._motion_cid = self.canvas.mpl_connect("motion_notify_event", self.on_motion)
+
+            # Refine the decimated envelope whenever the toolbar zooms/pans the X axis
+            if self.trace_decimated or self.capture_view is not None:
+                self.refine_lod()
+                self.ax.callbacks.connect('xlim_changed', lambda ax: self.refine_lod())
+
+            self.canvas.draw_idle() 
+
+    def draw_envelope(self):
+        """Shades the min/max envelope and ±1 std band of an averaged trace, in plot units."""
+        for artist in self.envelope_artists:
+            artist.remove()
+        self.envelope_artists = []
+        envelope = self.envelope
+        if envelope is None or self.plot_x is None or len(envelope["min"]) != len(self.plot_x):
+            return
 
-        self.last_x_data = x_data
-        self.last_y_data = y_data
+        x = self.plot_x
+        low = envelope["min"] * self.plot_y_scale
+        high = envelope["max"] * self.plot_y_scale
+        band_low = self.plot_y - envelope["std"] * self.plot_y_scale
+        band_high = self.plot_y + envelope["std"] * self.plot_y_scale
+
+        # Long averages are reduced to per-bin extremes so the fill stays cheap to draw
+        step = len(x) // (LOD_POINTS_PER_PIXEL * self.lod_pixel_width())
+        if step > 1:
+            bins = np.arange(0, len(x), step)
+            x = x[bins]
+            low, band_low = np.minimum.reduceat(low, bins), np.minimum.reduceat(band_low, bins)
+            high, band_high = np.maximum.reduceat(high, bins), np.maximum.reduceat(band_high, bins)
+
+        color = self.trace_line.get_color()
+        self.envelope_artists = [
+            self.ax.fill_between(x, low, high, color=color, alpha=0.15, linewidth=0, label="Min/Max"),
+            self.ax.fill_between(x, band_low, band_high, color=color, alpha=0.3, linewidth=0, label="±1σ"),
+        ]
+        self.ax.legend()
 
-        x_scale = self.unit_scale_x.get(self.x_unit, 1)
-        y_scale = self.unit_scale_y.get(self.y_unit, 1)
-        x = [v * x_scale for v in x_data]
-        y = [v * y_scale for v in y_data]
+    def remember_capture(self, name, x_data, y_data, source=None, analysis=None):
+        """Adds the displayed capture to the shared library; evicted captures leave the overlay."""
+        try:
+            entry, evicted = library.add(name, x_data, y_data, source, analysis)
+        except Exception as e:
+            log.warning("Could not add %s to the capture library: %s", name, e)
+            return
+        self.current_entry_key = entry.key
+        if evicted:
+            self.overlay_keys -= {old.key for old in evicted}
+            log.info("Capture library over budget, evicted: %s", ", ".join(old.name for old in evicted))
+        if getattr(self, 'library_dialog', None) is not None:
+            self.library_dialog.refresh()
+
+    def show_library(self):
+        """Opens (or raises) the capture library panel."""
+        if getattr(self, 'library_dialog', None) is None:
+            self.library_dialog = CaptureLibraryDialog(self, self.centralwidget.window())
+        self.library_dialog.refresh()
+        self.library_dialog.show()
+        self.library_dialog.raise_()
+
+    def show_library_entry(self, key):
+        """Makes a library capture the main trace, without re-reading its source."""
+        entry = library.get(key)
+        if entry is None:
+            return
+        self.current_entry_key = entry.key
+        self.overlay_keys.discard(entry.key)
+        self.load_direct_data(entry.time, entry.current.astype(np.float64), remember=False)
+        self.current_file_path = None
+        self.set_raw_frames(None)
+
+    def set_overlays(self, keys):
+        self.overlay_keys = set(keys)
+        if self.plot_x is not None:
+            self.draw_overlays()
+            self.canvas.draw_idle()
+
+    def draw_overlays(self):
+        """
+        Draws the checked library captures over the main trace, each aligned on
+        the current trigger settings and min/max decimated to the canvas width.
+        """
+        for artist in self.overlay_artists:
+            artist.remove()
+        self.overlay_artists = []
+        if self.plot_x is None:
+            return
 
-        self.ax.plot(x, y, label="Pulse", linestyle='-', marker='o')
-        self.ax.set_xlabel(f"Time ({self.x_unit})")
-        self.ax.set_ylabel(f"Current ({self.y_unit})")
-        self.ax.grid(True)
+        for key in sorted(self.overlay_keys):
+            entry = library.get(key)
+            if entry is None or key == self.current_entry_key:
+                continue
+            x = entry.time
+            y = entry.current.astype(np.float64)
+            trigger_time = x[0]
+            engine = self.trigger_engine(x)
+            if engine is not None:
+                found, _ = engine.trigger_time(x, y, self.trigger_event())
+                trigger_time = found if found is not None else trigger_time
+
+            x = (x - trigger_time) * self.plot_x_scale
+            y = y * self.plot_y_scale
+            if len(x) > LOD_POINTS_PER_PIXEL * self.lod_pixel_width():
+                x, y = minmax_decimate(x, y, x[0], x[-1], self.lod_pixel_width())
+            line, = self.ax.plot(x, y, linewidth=1, alpha=0.8, label=entry.name)
+            self.overlay_artists.append(line)
+
+        self.overlay_keys = {key for key in self.overlay_keys if library.get(key) is not None}
         self.ax.legend()
 
+    def lod_pixel_width(self):
+        """Number of pixel columns available to the plot."""
+        return max(int(self.figure.get_figwidth() * self.figure.dpi), 100)
+
+    def read_capture_view(self, view, start, stop):
+        """Times and processed currents of capture samples [start, stop), strided to CAPTURE_VIEW_SAMPLES."""
+        from ByteCombine import clean_currents
+        capture = view["capture"]
+        step = max(-(-(stop - start) // CAPTURE_VIEW_SAMPLES), 1)
+        x = capture.times(start, stop, step)
+        y = np.asarray(clean_currents(capture.currents(start, stop, step), filtered=view["filtered"]))
+        return x, y
+
+    def refine_capture_view(self):
+        """Reads only the visible range of a large capture and decimates it to the canvas width."""
+        capture = self.capture_view["capture"]
+        # File time of plot x = 0; the first plotted sample is the first sample of the file
+        offset = capture.start_time - self.plot_x[0] / self.plot_x_scale
+        x_lo, x_hi = self.ax.get_xlim()
+        start, stop = capture.index_range(x_lo / self.plot_x_scale + offset, x_hi / self.plot_x_scale + offset)
+        if stop - start < 2:
+            return
+        x, y = self.read_capture_view(self.capture_view, start, stop)
+        x = (x - offset) * self.plot_x_scale
+        y = y * self.plot_y_scale
+        plot_x, plot_y = minmax_decimate(x, y, x[0], x[-1], self.lod_pixel_width())
+        self.trace_line.set_data(plot_x, plot_y)
+        self.canvas.draw_idle()
+
+    def refine_lod(self):
+        """Re-decimates the trace for the visible X range at the canvas pixel width."""
+        if getattr(self, 'capture_view', None) is not None and self.trace_line is not None:
+            self.refine_capture_view()
+            return
+        if not getattr(self, 'trace_decimated', False):
+            return
+        x_lo, x_hi = self.ax.get_xlim()
+        plot_x, plot_y = minmax_decimate(self.plot_x, self.plot_y, x_lo, x_hi, self.lod_pixel_width())
+        self.trace_line.set_data(plot_x, plot_y)
+        self.canvas.draw_idle()
+        
+
+    def apply_axis_limits(self, x, y):
+        """Applies min/max, units/div and tick settings to the current axes."""
         # --- X Axis ---
         final_x_min, final_x_max = self.compute_axis_limits(
             x, self.x_min, self.x_max, self.x_div, "X", is_x_axis=True
@@ -770,12 +1562,9 @@ class Ui_MainWindow(object):
             min_x, max_x = self.ax.get_xlim()
             start_tick = (min_x // self.x_div) * self.x_div
             end_tick = (max_x // self.x_div + 20) * self.x_div
-            ticks = []
-            val = start_tick
-            while val <= end_tick:
-                ticks.append(val)
-                val += self.x_div
-            self.ax.set_xticks(ticks)
+            self.ax.set_xticks(np.arange(start_tick, end_tick + self.x_div / 2, self.x_div))
+        else:
+            self.ax.xaxis.set_major_locator(AutoLocator())
 
         # --- Y Axis ---
         final_y_min, final_y_max = self.compute_axis_limits(
@@ -788,37 +1577,125 @@ class Ui_MainWindow(object):
             min_y, max_y = self.ax.get_ylim()
             start_tick = (min_y // self.y_div) * self.y_div
             end_tick = (max_y // self.y_div + 20) * self.y_div
-            ticks = []
-            val = start_tick
-            while val <= end_tick:
-                ticks.append(val)
-                val += self.y_div
-            self.ax.set_yticks(ticks)
-
-        # --- Redraw Markers on Fresh Axes ---
-        new_markers = []
-        for old_marker in self.markers:
-            m = InteractiveMarker(self.ax, old_marker.orientation, old_marker.position, old_marker.label)
-            new_markers.append(m)
-        self.markers = new_markers
-
-        # Reconnect click handler to new canvas/axes
-        self.canvas.mpl_disconnect(getattr(self, '_marker_click_cid', None))
-        self._marker_click_cid = self.canvas.mpl_connect("button_press_event", self.on_click)
-        self.canvas.mpl_disconnect(getattr(self, "_click_cid", None))
-        self.canvas.mpl_disconnect(getattr(self, "_release_cid", None))
-        self.canvas.mpl_disconnect(getattr(self, "_motion_cid", None))
-
-        self._click_cid = self.canvas.mpl_connect("button_press_event", self.on_click)
-        self._release_cid = self.canvas.mpl_connect("button_release_event", self.on_release)
-        self._motion_cid = self.canvas.mpl_connect("motion_notify_event", self.on_motion)
+            self.ax.set_yticks(np.arange(start_tick, end_tick + self.y_div / 2, self.y_div))
+        else:
+            self.ax.yaxis.set_major_locator(AutoLocator())
 
-        self.canvas.draw_idle() 
-        
+    def trigger_engine(self, x_data=None, sample_period=None):
+        """
+        TriggerEngine from the Trigger controls, or None without a valid threshold.
+        Holdoff is entered in seconds and converted with `sample_period`, or the
+        sample spacing of x_data when no period is given.
+        """
+        try:
+            level = float(self.trigger_threshold.text())
+        except ValueError:
+            return None
+        try: hysteresis = float(self.trigger_hysteresis.text())
+        except ValueError: hysteresis = 0.0
+        try: holdoff = float(self.trigger_holdoff.text())
+        except ValueError: holdoff = 0.0
+
+        holdoff_samples = 0
+        spacing = sample_period
+        if spacing is None and x_data is not None and len(x_data) > 1:
+            spacing = (x_data[-1] - x_data[0]) / (len(x_data) - 1)
+        if holdoff > 0 and spacing is not None:
+            holdoff_samples = int(np.ceil(holdoff / spacing)) if spacing > 0 else 0
+        return TriggerEngine(level, self.trigger_edge.currentText(), hysteresis, holdoff_samples)
+
+    def trigger_event(self):
+        try:
+            return max(int(self.trigger_event_input.text()), 1)
+        except ValueError:
+            return 1
+
+    def trigger_key(self):
+        """Snapshot of the Trigger controls, to tell whether a re-trigger is needed."""
+        return (self.trigger_threshold.text(), self.trigger_edge.currentText(), self.trigger_hysteresis.text(),
+                self.trigger_holdoff.text(), self.trigger_event_input.text())
+
+    def find_trigger_time(self, x_data, y_data):
+        """
+        Time the trace is aligned on: the interpolated crossing of the selected
+        trigger event, or the first sample without a threshold or that many events.
+        """
+        x_data = np.asarray(x_data, dtype=np.float64)
+        engine = self.trigger_engine(x_data)
+        if engine is None or len(x_data) == 0:
+            return float(x_data[0]) if len(x_data) else 0.0
+
+        event = self.trigger_event()
+        trigger_time, found = engine.trigger_time(x_data, y_data, event)
+        log.debug("Trigger %s at %.6f A: %d events, event %d at %s", engine.edge, engine.level, found, event,
+                  trigger_time)
+        if trigger_time is None:
+            self.statusbar.showMessage(f"Trigger: {found} event(s) found, event {event} not reached", 5000)
+            return float(x_data[0])
+        self.statusbar.showMessage(f"Trigger: event {event} of {found}", 5000)
+        return trigger_time
+
+    def set_trigger_source(self, x_data, y_data, trigger_time):
+        """Remembers the unaligned trace so later trigger changes only shift the plot."""
+        self.trigger_source = (np.asarray(x_data, dtype=np.float64), y_data)
+        self.trigger_offset = trigger_time
+        self.applied_trigger = self.trigger_key()
+
+    def can_update_incrementally(self):
+        """True when the plotted trace can be re-scaled or re-triggered in place instead of reloaded."""
+        return (self.trace_line is not None
+                and self.trace_line.axes is self.ax
+                and self.plot_x is not None
+                and (self.trigger_key() == getattr(self, 'applied_trigger', None)
+                     or getattr(self, 'trigger_source', None) is not None))
+
+    def update_axes_incremental(self):
+        """
+        Updates unit scaling, trigger alignment, limits, ticks and marker
+        positions of the existing plot in place. No file I/O or statistics are
+        involved; a new trigger only shifts the time axis.
+        """
+        with stage("render", len(self.plot_x)):
+            x_scale = self.unit_scale_x.get(self.x_unit, 1)
+            y_scale = self.unit_scale_y.get(self.y_unit, 1)
+            x_factor = x_scale / self.plot_x_scale
+            y_factor = y_scale / self.plot_y_scale
+
+            if self.trigger_key() != getattr(self, 'applied_trigger', None):
+                source_x, source_y = self.trigger_source
+                trigger_time = self.find_trigger_time(source_x, source_y)
+                self.last_x_data = source_x - trigger_time
+                self.plot_x = self.last_x_data * self.plot_x_scale
+                self.trigger_offset = trigger_time
+                self.applied_trigger = self.trigger_key()
+
+            if x_factor != 1:
+                self.plot_x = self.plot_x * x_factor
+            if y_factor != 1:
+                self.plot_y = self.plot_y * y_factor
+            self.plot_x_scale = x_scale
+            self.plot_y_scale = y_scale
+
+            self.ax.set_xlabel(f"Time ({self.x_unit})")
+            self.ax.set_ylabel(f"Current ({self.y_unit})")
+
+            if not self.trace_decimated:
+                self.trace_line.set_data(self.plot_x, self.plot_y)
+            self.draw_envelope()
+            self.draw_overlays()
+            self.apply_axis_limits(self.plot_x, self.plot_y)
+            self.refine_lod()
+
+            for marker in self.markers:
+                factor = x_factor if marker.orientation == 'vline' else y_factor
+                marker.update_position(marker.position * factor)
+            self.update_marker_labels()
+
+            self.canvas.draw_idle()
 
     def compute_axis_limits(self, data, min_val, max_val, units_per_div, label, is_x_axis=True):
         NUM_DIVS = 10
-        data_min, data_max = min(data), max(data)
+        data_min, data_max = float(np.min(data)), float(np.max(data))
         center = (data_min + data_max) / 2
 
         if min_val is not None and max_val is not None:
@@ -837,7 +1714,7 @@ class Ui_MainWindow(object):
             axis_max = data_max + pad
             reason = "auto"
 
-        print(f"Using {reason} for {label}: {axis_min} to {axis_max}")
+        log.debug("Using %s for %s: %s to %s", reason, label, axis_min, axis_max)
         return axis_min, axis_max
 
     def save_file(self):
@@ -940,7 +1817,7 @@ class MarkerManager:
         self.info_output = fn
 
     def on_click(self, event: MouseEvent):
-        print(f"Click at ({event.xdata}, {event.ydata})")  # Debug
+        log.debug("Click at (%s, %s)", event.xdata, event.ydata)
         if not event.inaxes or not self.enable_check():
             return
 
@@ -949,9 +1826,7 @@ class MarkerManager:
             position = event.xdata if orientation == 'vline' else event.ydata
             marker_label = f"M{self.marker_counter}"
             marker = InteractiveMarker(self.ax, orientation, position, label=marker_label)
-            print(f"Added {orientation} marker at {position}")
-            print(f"Axes title: {self.ax.get_title()}")
-            print(f"Line object: {marker.line}")
+            log.debug("Added %s marker at %s", orientation, position)
             self.marker_counter += 1
             self.markers.append(marker)
 
@@ -1005,6 +1880,7 @@ class MarkerManager:
         self.info_output("\n".join(text_lines))
 
 if __name__ == "__main__":
+    configure_logging()
     app = QtWidgets.QApplication(sys.argv)
     MainWindow = QtWidgets.QMainWindow()
     ui = Ui_MainWindow()
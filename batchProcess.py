@@ -0,0 +1,212 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+
+from ByteCombine import clean_currents, process_samples, stream_dc_bias
+from captureFile import open_capture, CAPTURE_EXTENSION
+from csvRead import capture_metrics, parse_csv_arrays
+from diagnostics import configure_logging, get_logger
+
+# Headless batch processing of capture files: filtering and metrics on every
+# core, one consolidated report. No Qt or Tk is imported.
+#
+#   python batchProcess.py captures/                         # every .tsc/.csv → batch_report.csv
+#   python batchProcess.py "nightly/**/*.tsc" --jobs 8 --filter Filtered
+#   python batchProcess.py captures/ --recursive --pulses all_pulses.csv --json batch_report.json
+DEFAULT_OUTPUT = "batch_report.csv"
+CAPTURE_PATTERNS = ["*" + CAPTURE_EXTENSION, "*.csv"]
+FILTER_CHOICES = ["Filtered", "Unfiltered"]
+
+# Column header units of processed CSVs (as exported by the analysis window), scaled to s and A
+UNIT_SCALES = {"s": 1.0, "ms": 1e-3, "us": 1e-6, "A": 1.0, "mA": 1e-3, "uA": 1e-6}
+
+log = get_logger("batchProcess")
+
+
+def expand_inputs(inputs, recursive=False, exclude=()):
+    """
+    Capture files named by paths, directories or glob patterns, sorted and
+    de-duplicated. Paths in `exclude` (the report files of this run) are left out.
+    """
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in CAPTURE_PATTERNS:
+                files.update(glob.glob(os.path.join(item, "**" if recursive else "", pattern), recursive=recursive))
+        elif os.path.isfile(item):
+            files.add(item)
+        else:
+            files.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+    excluded = {os.path.abspath(path) for path in exclude if path}
+    return sorted(path for path in map(os.path.abspath, files) if path not in excluded)
+
+
+def summary_path(output):
+    """Summary file written next to the report: batch_report.csv -> batch_report_summary.csv."""
+    root, ext = output.rsplit('.', 1) if '.' in output else (output, 'csv')
+    return f"{root}_summary.{ext}"
+
+
+def header_scale(label):
+    """Scale to SI from a "Name (unit)" column header; 1.0 when no known unit is given."""
+    if "(" in label and ")" in label:
+        unit = label.split("(")[-1].split(")")[0].split(",")[-1].strip()
+        return UNIT_SCALES.get(unit, 1.0)
+    return 1.0
+
+
+def load_capture(path, filter_mode=None):
+    """
+    Loads one capture as (times in s, currents in A, processing applied).
+
+    - .tsc: raw ADC words, cleaned with the stored filter mode (or `filter_mode`)
+    - raw byte CSV (Time, Byte1..Byte4): converted and cleaned like a fresh acquisition
+    - processed CSV (time, current): used as-is, units taken from the column headers
+    """
+    if path.endswith(CAPTURE_EXTENSION):
+        capture = open_capture(path)
+        mode = filter_mode or capture.filter_mode
+        currents = np.asarray(clean_currents(capture.currents(), filtered=(mode == "Filtered")))
+        return capture.times(), currents, mode
+
+    with open(path, encoding='utf-8-sig') as f:
+        header = f.readline().strip().split(",")
+    if len(header) >= 5 and header[1].strip().lower().startswith("byte"):
+        mode = filter_mode or "Filtered"
+        times, currents = process_samples(path, filtered=(mode == "Filtered"))
+        return times, currents, mode
+
+    times, currents = parse_csv_arrays(path)
+    return times * header_scale(header[0]), currents * header_scale(header[1]), "As saved"
+
+
+def dc_bias_metrics(capture):
+    """Bias of a DC Bias recording, streamed through running statistics chunk by chunk."""
+    stats = stream_dc_bias(capture.iter_frames(), baseline=capture.baseline)
+    if stats.count == 0:
+        raise ValueError("No data in capture.")
+    return {"dc_bias_A": stats.mean, "dc_bias_std_A": stats.std, "dc_bias_min_A": stats.min,
+            "dc_bias_max_A": stats.max}
+
+
+def process_file(path, filter_mode=None, want_pulses=False):
+    """
+    Worker: loads, cleans and measures one capture. Never raises; failures are
+    reported in the "error" column so one bad file doesn't stop the batch.
+    Returns (report row, per-pulse DataFrame or None).
+    """
+    start = time.perf_counter()
+    row = {"file": path}
+    pulses = None
+    try:
+        capture = open_capture(path) if path.endswith(CAPTURE_EXTENSION) else None
+        if capture is not None and (filter_mode or capture.filter_mode) == "DC Bias":
+            # A bias recording has no pulses to measure; its bias is reported instead
+            row.update(processing="DC Bias", samples=len(capture),
+                       duration_s=max(len(capture) - 1, 0) * capture.sample_period)
+            row.update(dc_bias_metrics(capture))
+        else:
+            times, currents, mode = load_capture(path, filter_mode)
+            row.update(processing=mode, samples=len(currents),
+                       duration_s=float(times[-1] - times[0]) if len(times) > 1 else 0.0)
+            metrics, pulses = capture_metrics(times, currents)
+            if metrics is None:
+                raise ValueError("No data in capture.")
+            row.update(metrics)
+        row["error"] = ""
+    except Exception as e:
+        row["error"] = str(e)
+        pulses = None
+    row["elapsed_s"] = time.perf_counter() - start
+
+    if not want_pulses or pulses is None or pulses.empty:
+        return row, None
+    pulses = pulses.reset_index().rename(columns={"index": "Pulse"})
+    pulses.insert(0, "file", path)
+    return row, pulses
+
+
+def summarize_report(report):
+    """count/mean/std/min/max of every numeric metric across the successfully processed files."""
+    ok = report[report["error"] == ""]
+    numeric = ok.select_dtypes(include=["number"]).drop(columns=["elapsed_s"], errors="ignore")
+    return numeric.agg(["count", "mean", "std", "min", "max"]).T
+
+
+def run_batch(files, jobs=None, filter_mode=None, want_pulses=False, on_result=None):
+    """
+    Processes `files` on a pool of `jobs` processes (all cores by default).
+    Returns (report DataFrame in input order, combined per-pulse DataFrame or None).
+    """
+    jobs = jobs or os.cpu_count() or 1
+    # A few chunks per worker keeps pickling overhead low without starving the pool at the end
+    chunksize = max(1, len(files) // (jobs * 4))
+
+    rows, pulse_tables = [], []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=configure_logging) as pool:
+        results = pool.map(process_file, files, repeat(filter_mode), repeat(want_pulses), chunksize=chunksize)
+        for row, pulses in results:
+            rows.append(row)
+            if pulses is not None:
+                pulse_tables.append(pulses)
+            if on_result:
+                on_result(row)
+
+    report = pd.DataFrame(rows)
+    return report, (pd.concat(pulse_tables, ignore_index=True) if pulse_tables else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Filter and measure TeeSense capture files in parallel.")
+    parser.add_argument("inputs", nargs="+", help="Capture files, directories or glob patterns (.tsc / .csv)")
+    parser.add_argument("--recursive", action="store_true", help="Search directories recursively")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--filter", choices=FILTER_CHOICES, default=None,
+                        help="Override the processing stored with each capture")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Consolidated per-file metrics CSV")
+    parser.add_argument("--json", help="Also write the per-file metrics as JSON")
+    parser.add_argument("--pulses", help="Write every pulse of every capture to this CSV")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    summary = summary_path(args.output)
+    # Reports of an earlier run in the same directory are not captures
+    files = expand_inputs(args.inputs, args.recursive, exclude=(args.output, summary, args.json, args.pulses))
+    if not files:
+        print("No capture files found.", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    done = [0]
+
+    def progress(row):
+        done[0] += 1
+        if row["error"]:
+            print(f"[Batch] {os.path.basename(row['file'])}: {row['error']}", file=sys.stderr)
+        if done[0] % 100 == 0 or done[0] == len(files):
+            print(f"[Batch] {done[0]}/{len(files)} files")
+
+    report, pulses = run_batch(files, args.jobs, args.filter, bool(args.pulses), on_result=progress)
+    elapsed = time.perf_counter() - start
+
+    report.to_csv(args.output, index=False)
+    summarize_report(report).to_csv(summary, index_label="Metric")
+    if args.json:
+        report.to_json(args.json, orient="records", indent=2)
+    if args.pulses and pulses is not None:
+        pulses.to_csv(args.pulses, index=False)
+
+    failed = int((report["error"] != "").sum())
+    print(f"Processed {len(files) - failed}/{len(files)} files in {elapsed:.2f} s "
+          f"({len(files) / elapsed:.1f} files/s). Report: {args.output}, summary: {summary}")
+    return 1 if failed == len(files) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
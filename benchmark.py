@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+# Render off-screen so the plot stage runs headless (Agg rasterizer behind the Qt canvas)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import ByteCombine
+from ByteCombine import convert_samples, moving_average, detect_and_remove_outliers
+from csvRead import calculate_parameters, parse_csv_arrays
+from dataExport import write_columns_csv
+from serialCapture import SimulatedSerial, capture_samples, frames_to_rows
+
+# Capture-to-plot pipeline benchmark on synthetic pulse data.
+#
+#   python benchmark.py                           # 1k, 10k, 1M, 10M samples → benchmark_results.json
+#   python benchmark.py --sizes 1000 10000 --repeat 5
+#   python benchmark.py --compare old.json        # print the ratio against an earlier run
+#   python benchmark.py --sizes 1000 --imports    # also time cold imports of each entry point
+DEFAULT_SIZES = [1_000, 10_000, 1_000_000, 10_000_000]
+DEFAULT_OUTPUT = "benchmark_results.json"
+ENTRY_POINTS = ["dataCollect", "TeeSenseGUI"]
+STAGES = ["parse_ascii", "parse_binary", "convert", "moving_average", "remove_outliers",
+          "calculate_parameters", "csv_save", "csv_load", "display_raw_data"]
+
+
+def synthetic_frames(sample_count):
+    """(N, 4) byte frames made by repeating dataCollect.generate_fake_pulse_data."""
+    from dataCollect import generate_fake_pulse_data
+    pulse = np.array(generate_fake_pulse_data(), dtype=np.float64)[:, 1:5].astype(np.uint8)
+    return np.tile(pulse, (-(-sample_count // len(pulse)), 1))[:sample_count]
+
+
+def best_of(repeat, fn, *args):
+    """Runs fn(*args) `repeat` times. Returns (fastest time in s, last result)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def make_plot_window():
+    from PyQt5.QtWidgets import QApplication, QMainWindow
+    from TeeSenseGUI import Ui_MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = QMainWindow()
+    ui = Ui_MainWindow()
+    ui.setupUi(window)
+    return app, window, ui
+
+
+def render(ui, x, y):
+    ui.display_raw_data(x, y)
+    ui.canvas.draw()
+
+
+def run_size(sample_count, repeat, ui=None, workdir="."):
+    """Times every pipeline stage for one capture size. Returns {stage: seconds}."""
+    frames = synthetic_frames(sample_count)
+    results = {}
+
+    ascii_port = SimulatedSerial(frames, binary=False, chunk_size=1 << 16)
+    results["parse_ascii"], _ = best_of(1, capture_samples, ascii_port, sample_count, None, False)
+    binary_port = SimulatedSerial(frames, binary=True, chunk_size=1 << 16)
+    results["parse_binary"], parsed = best_of(1, capture_samples, binary_port, sample_count, None, True)
+
+    rows = frames_to_rows(parsed)
+    results["convert"], (times, currents) = best_of(repeat, convert_samples, rows)
+    results["moving_average"], smoothed = best_of(repeat, moving_average, currents, 3)
+    results["remove_outliers"], cleaned = best_of(repeat, detect_and_remove_outliers, smoothed, 2, 3)
+
+    frame = pd.DataFrame({"Time": times, "Current": cleaned})
+    results["calculate_parameters"], _ = best_of(repeat, calculate_parameters, frame)
+
+    csv_path = os.path.join(workdir, f"bench_{sample_count}.csv")
+    try:
+        results["csv_save"], _ = best_of(repeat, write_columns_csv, csv_path,
+                                         ["Elapsed Time (s)", "Current (A)"], [times, cleaned])
+        results["csv_load"], _ = best_of(repeat, parse_csv_arrays, csv_path)
+    finally:
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+
+    if ui is not None:
+        results["display_raw_data"], _ = best_of(repeat, render, ui, times, cleaned)
+
+    return results
+
+
+def measure_import(module, repeat):
+    """Cold import time of `module` in fresh interpreters (fastest of `repeat`), in seconds."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_table(report, baseline=None):
+    sizes = list(report["results"])
+    print(f"{'stage':<22}" + "".join(f"{size:>14}" for size in sizes))
+    for stage in STAGES:
+        cells = []
+        for size in sizes:
+            value = report["results"][size].get(stage)
+            old = (baseline or {}).get("results", {}).get(size, {}).get(stage)
+            if value is None:
+                cells.append(f"{'-':>14}")
+            elif old:
+                cells.append(f"{value:>8.4f} x{value / old:<4.2f}")
+            else:
+                cells.append(f"{value:>14.4f}")
+        print(f"{stage:<22}" + "".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the TeeSense capture-to-plot pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Sample counts to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file for the results")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--no-gui", action="store_true", help="Skip the display_raw_data stage")
+    parser.add_argument("--imports", action="store_true", help="Time cold imports of each entry point")
+    args = parser.parse_args(argv)
+
+    ui = None
+    if not args.no_gui:
+        app, window, ui = make_plot_window()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "baseline_adc_value": ByteCombine.baseline_adc_value,
+        "results": {},
+    }
+
+    if args.imports:
+        report["imports"] = {}
+        for module in ENTRY_POINTS:
+            report["imports"][module] = measure_import(module, args.repeat)
+            print(f"[Benchmark] import {module}: {report['imports'][module]:.3f} s")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"[Benchmark] {size} samples...")
+            report["results"][str(size)] = run_size(size, args.repeat, ui, workdir)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared against {baseline.get('commit')} ({args.compare}); xN = this run / baseline")
+    print_table(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
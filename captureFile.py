@@ -0,0 +1,268 @@
+import os
+import queue
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+
+import ByteCombine
+from ByteCombine import SAMPLE_PERIOD, adc_to_current
+from diagnostics import get_logger
+
+log = get_logger("captureFile")
+
+# TeeSense capture file (.tsc)
+#
+# Fixed little-endian header followed by raw ADC words, 4 bytes per sample:
+#   magic (8s) | version (u16) | header size (u16) | channels (u16) | filter mode (u16)
+#   sample count (u64) | sample period in s (f64) | baseline ADC value (f64) | start time in s (f64)
+#   data: sample_count x [ADC1, ADC2] as little-endian uint16
+CAPTURE_MAGIC = b'TEESENSE'
+CAPTURE_VERSION = 1
+CAPTURE_EXTENSION = '.tsc'
+HEADER_FORMAT = '<8sHHHHQddd'
+HEADER_SIZE = 64
+CHANNELS = 2
+WORD_DTYPE = np.dtype('<u2')
+
+FILTER_MODES = {"Unfiltered": 0, "Filtered": 1, "DC Bias": 2}
+
+RECORDINGS_DIR = 'recordings'  # Where acquisitions are recorded while they run
+JOURNAL_SUFFIX = '.part'  # In-progress recording; header count is refreshed at every sync
+CHUNK_SAMPLES = 1 << 20  # Samples per chunk when a whole capture is streamed
+COUNT_OFFSET = 16  # Byte offset of the sample count field in the header
+
+
+def frames_to_words(frames):
+    """(N, 4) byte frames [ADC1 high, ADC1 low, ADC2 high, ADC2 low] → (N, 2) uint16 ADC words."""
+    raw = np.asarray(frames).astype(np.uint16)
+    return np.column_stack(((raw[:, 0] << 8) | raw[:, 1], (raw[:, 2] << 8) | raw[:, 3]))
+
+
+def pack_header(sample_count, baseline, sample_period=SAMPLE_PERIOD, filter_mode="Unfiltered", start_time=0.0):
+    if filter_mode not in FILTER_MODES:
+        raise ValueError(f"Unknown filter mode: {filter_mode}")
+    header = struct.pack(HEADER_FORMAT, CAPTURE_MAGIC, CAPTURE_VERSION, HEADER_SIZE, CHANNELS,
+                         FILTER_MODES[filter_mode], sample_count, sample_period, baseline, start_time)
+    return header.ljust(HEADER_SIZE, b'\0')
+
+
+def write_capture(path, frames, baseline=None, sample_period=SAMPLE_PERIOD, filter_mode="Unfiltered", start_time=0.0):
+    """
+    Writes raw capture frames to a .tsc file.
+
+    Parameters:
+    - frames: (N, 4) byte frames, or (N, 2) ADC words
+    - baseline: Calibration baseline (defaults to the current zeroed baseline_adc_value)
+    - sample_period: Time base in seconds
+    - filter_mode: Processing to reapply on open ("Filtered", "Unfiltered" or "DC Bias")
+    """
+    frames = np.asarray(frames)
+    words = frames if frames.shape[1] == CHANNELS else frames_to_words(frames)
+    if baseline is None:
+        baseline = ByteCombine.baseline_adc_value
+
+    # Written next to the target and swapped in, so `frames` may be a memmap of `path` itself
+    fd, temp_path = tempfile.mkstemp(suffix=CAPTURE_EXTENSION + '.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pack_header(len(words), baseline, sample_period, filter_mode, start_time))
+            np.ascontiguousarray(words, dtype=WORD_DTYPE).tofile(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class CaptureFile:
+    """
+    Memory-mapped .tsc capture. Opening only reads the header; samples are
+    paged in from disk when a range is actually converted.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(struct.calcsize(HEADER_FORMAT))
+
+        if len(header) < struct.calcsize(HEADER_FORMAT):
+            raise ValueError("File is too short to be a TeeSense capture.")
+
+        (magic, version, header_size, channels, filter_code,
+         self.sample_count, self.sample_period, self.baseline, self.start_time) = struct.unpack(HEADER_FORMAT, header)
+
+        if magic != CAPTURE_MAGIC:
+            raise ValueError("Not a TeeSense capture file.")
+        if version > CAPTURE_VERSION:
+            raise ValueError(f"Unsupported capture file version {version}.")
+
+        modes = {code: name for name, code in FILTER_MODES.items()}
+        if filter_code not in modes:
+            raise ValueError(f"Unknown filter mode code {filter_code} in capture header.")
+        self.filter_mode = modes[filter_code]
+        if self.sample_count:
+            self.words = np.memmap(path, dtype=WORD_DTYPE, mode='r', offset=header_size,
+                                   shape=(self.sample_count, channels))
+        else:
+            self.words = np.empty((0, channels), dtype=WORD_DTYPE)
+
+    def __len__(self):
+        return self.sample_count
+
+    def index_range(self, t_start=None, t_stop=None):
+        """Sample index range [start, stop) covering times t_start..t_stop in seconds."""
+        start = 0 if t_start is None else int(np.floor((t_start - self.start_time) / self.sample_period))
+        stop = self.sample_count if t_stop is None else int(np.ceil((t_stop - self.start_time) / self.sample_period)) + 1
+        return max(start, 0), min(max(stop, 0), self.sample_count)
+
+    def times(self, start=0, stop=None, step=1):
+        """Time axis in seconds for every `step`-th sample in [start, stop)."""
+        stop = self.sample_count if stop is None else stop
+        return self.start_time + np.arange(start, stop, step, dtype=np.float64) * self.sample_period
+
+    def currents(self, start=0, stop=None, step=1):
+        """Current in A for every `step`-th sample in [start, stop), using the baseline stored with the capture."""
+        words = self.words[start:stop:step].astype(np.float64)
+        return adc_to_current(words.mean(axis=1), self.baseline)
+
+    def frames(self, start=0, stop=None):
+        """Samples [start, stop) as (N, 4) byte frames, as read from the serial port."""
+        words = np.asarray(self.words[start:stop])
+        return np.column_stack((words[:, 0] >> 8, words[:, 0] & 0xFF,
+                                words[:, 1] >> 8, words[:, 1] & 0xFF)).astype(np.uint8)
+
+    def iter_frames(self, chunk_size=CHUNK_SAMPLES):
+        """(n, 4) byte frames in chunks of `chunk_size` samples, for streaming the whole capture."""
+        for start in range(0, self.sample_count, chunk_size):
+            yield self.frames(start, start + chunk_size)
+
+
+def open_capture(path):
+    """Opens a .tsc capture file in constant time."""
+    return CaptureFile(path)
+
+
+class CaptureRecorder:
+    """
+    Streams raw frames to a .tsc file from a background writer thread while a
+    capture runs, so capture length is bounded by disk rather than memory.
+
+    Data goes to a `<path>.part` journal whose header sample count is rewritten
+    and fsync'd every `sync_interval` seconds; a crashed recording can be turned
+    back into a valid capture with recover_capture(). close() renames the journal
+    to `path`. The queue is bounded: if the disk falls behind, write() blocks.
+    """
+
+    def __init__(self, path, baseline=None, sample_period=SAMPLE_PERIOD, filter_mode="Unfiltered",
+                 queue_size=64, sync_interval=1.0):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.baseline = ByteCombine.baseline_adc_value if baseline is None else baseline
+        self.sample_period = sample_period
+        self.filter_mode = filter_mode
+        self.sync_interval = sync_interval
+        self.sample_count = 0
+        self.error = None
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = open(self.journal_path, 'wb')
+        self._file.write(pack_header(0, self.baseline, sample_period, filter_mode))
+        self._sync()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, frames):
+        """Queues a chunk of (n, 4) byte frames or (n, 2) ADC words for writing."""
+        if self.error is not None:
+            raise self.error
+        frames = np.asarray(frames)
+        if len(frames):
+            words = frames if frames.shape[1] == CHANNELS else frames_to_words(frames)
+            self._queue.put(np.ascontiguousarray(words, dtype=WORD_DTYPE))
+
+    def tee(self, frame_chunks):
+        """Generator that records every chunk of frame_chunks while passing it through."""
+        for frames in frame_chunks:
+            self.write(frames)
+            yield frames
+
+    def close(self):
+        """Flushes remaining chunks, finalizes the header and publishes the .tsc file."""
+        self._queue.put(None)
+        self._thread.join()
+        self._sync()
+        self._file.close()
+        os.replace(self.journal_path, self.path)
+        if self.error is not None:
+            raise self.error
+        return self.path
+
+    def _sync(self):
+        # Header count only ever covers bytes already written, so the journal stays valid
+        self._file.flush()
+        end = self._file.tell()
+        self._file.seek(COUNT_OFFSET)
+        self._file.write(struct.pack('<Q', self.sample_count))
+        self._file.seek(end)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _run(self):
+        last_sync = time.time()
+        while True:
+            words = self._queue.get()
+            if words is None:
+                return
+            try:
+                self._file.write(words.tobytes())
+                self.sample_count += len(words)
+                if time.time() - last_sync >= self.sync_interval:
+                    self._sync()
+                    last_sync = time.time()
+            except Exception as e:
+                self.error = e
+
+
+def recover_capture(journal_path):
+    """
+    Turns an interrupted `.part` recording into a valid .tsc capture, keeping
+    every complete sample on disk. Returns the recovered capture path, or None
+    if the journal died before its header was written (it is deleted).
+    """
+    size = os.path.getsize(journal_path)
+    with open(journal_path, 'rb') as f:
+        magic = f.read(len(CAPTURE_MAGIC))
+    if size < HEADER_SIZE or magic != CAPTURE_MAGIC:
+        log.warning("Deleting %s: %d bytes, no complete capture header to recover", journal_path, size)
+        os.remove(journal_path)
+        return None
+
+    sample_count = max(size - HEADER_SIZE, 0) // (CHANNELS * WORD_DTYPE.itemsize)
+
+    with open(journal_path, 'r+b') as f:
+        f.truncate(HEADER_SIZE + sample_count * CHANNELS * WORD_DTYPE.itemsize)
+        f.seek(COUNT_OFFSET)
+        f.write(struct.pack('<Q', sample_count))
+
+    path = journal_path[:-len(JOURNAL_SUFFIX)]
+    os.replace(journal_path, path)
+    return path
+
+
+def recover_recordings(directory):
+    """Recovers every interrupted recording in `directory`. Returns the recovered paths."""
+    if not os.path.isdir(directory):
+        return []
+    recovered = (recover_capture(os.path.join(directory, name))
+                 for name in sorted(os.listdir(directory)) if name.endswith(CAPTURE_EXTENSION + JOURNAL_SUFFIX))
+    return [path for path in recovered if path is not None]
+
+
+def new_recording(filter_mode="Unfiltered", directory=RECORDINGS_DIR, **kwargs):
+    """Starts a CaptureRecorder on a timestamped .tsc file in `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    name = datetime.now().strftime("capture_%Y%m%d_%H%M%S_%f") + CAPTURE_EXTENSION
+    return CaptureRecorder(os.path.join(directory, name), filter_mode=filter_mode, **kwargs)
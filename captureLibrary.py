@@ -0,0 +1,149 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+from diagnostics import get_logger
+
+log = get_logger("captureLibrary")
+
+# Captures kept in memory for overlay and comparison, shared by every analysis
+# window in the process. Entries are evicted least recently used first once
+# their arrays exceed the budget.
+LIBRARY_BUDGET_BYTES = 512 * 1024 * 1024
+UNIFORM_TOLERANCE = 1e-6  # Relative step deviation still treated as a fixed sample period
+
+
+class LibraryEntry:
+    """
+    One capture in compact form: current as float32, and time as start + period
+    when the steps are uniform (a full float64 axis otherwise). Metrics are
+    computed on first use and kept with the entry.
+    """
+
+    def __init__(self, key, name, x_data, y_data, source=None, signature=None, analysis=None):
+        self.key = key
+        self.name = name
+        self.source = source  # File path, or None for an acquisition
+        self.signature = signature  # (mtime_ns, size) of the source file
+        self.added = time.time()
+
+        x = np.asarray(x_data, dtype=np.float64)
+        self.current = np.asarray(y_data, dtype=np.float32)
+        self.length = len(self.current)
+        self.start = float(x[0]) if len(x) else 0.0
+        self.period = None
+        self._time = None
+
+        steps = np.diff(x)
+        if len(steps) and np.all(np.abs(steps - steps[0]) <= abs(steps[0]) * UNIFORM_TOLERANCE):
+            self.period = float(steps[0])
+        else:
+            self._time = x
+
+        self._analysis = analysis
+
+    @property
+    def time(self):
+        if self._time is not None:
+            return self._time
+        return self.start + np.arange(self.length, dtype=np.float64) * (self.period or 0.0)
+
+    @property
+    def nbytes(self):
+        return self.current.nbytes + (self._time.nbytes if self._time is not None else 0)
+
+    def analysis(self):
+        """(formatted stats, per-pulse DataFrame), computed on first use."""
+        if self._analysis is None:
+            from csvRead import analyze
+            self._analysis = analyze(self.time, self.current.astype(np.float64))
+        return self._analysis
+
+
+class CaptureLibrary:
+    """Thread-safe LRU collection of LibraryEntry objects bounded by `budget_bytes`."""
+
+    def __init__(self, budget_bytes=LIBRARY_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()
+        self._keys = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self.entries.values()))
+
+    @property
+    def total_bytes(self):
+        return sum(entry.nbytes for entry in self.entries.values())
+
+    def add(self, name, x_data, y_data, source=None, analysis=None):
+        """
+        Adds a capture; `analysis` may pass in stats already computed for it.
+        A file already in the library with the same mtime and size is returned
+        as-is. Returns (entry, evicted entries).
+        """
+        signature = None
+        if source is not None:
+            stat = os.stat(source)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            existing = self.find_source(source, signature)
+            if existing is not None:
+                return existing, []
+
+        with self._lock:
+            entry = LibraryEntry(next(self._keys), name, x_data, y_data, source, signature, analysis)
+            self.entries[entry.key] = entry
+            evicted = self._evict(keep=entry.key)
+        log.debug("Library: added %s (%d samples, %d bytes), %d evicted", name, entry.length, entry.nbytes,
+                  len(evicted))
+        return entry, evicted
+
+    def find_source(self, source, signature=None):
+        """Entry loaded from `source` (matching `signature` if given), marked as recently used."""
+        path = os.path.abspath(source)
+        with self._lock:
+            for entry in self.entries.values():
+                if entry.source is not None and os.path.abspath(entry.source) == path \
+                        and (signature is None or entry.signature == signature):
+                    self.entries.move_to_end(entry.key)
+                    return entry
+        return None
+
+    def get(self, key):
+        """Entry for `key`, or None if it was evicted; marks it as recently used."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def remove(self, key):
+        with self._lock:
+            return self.entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def _evict(self, keep):
+        evicted = []
+        total = self.total_bytes
+        while total > self.budget_bytes and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            if key == keep:
+                self.entries.move_to_end(key)
+                key = next(iter(self.entries))
+            entry = self.entries.pop(key)
+            total -= entry.nbytes
+            evicted.append(entry)
+        return evicted
+
+
+library = CaptureLibrary()
@@ -1,31 +1,85 @@
-﻿import csv
-import matplotlib.pyplot as plt
+﻿import os
+from collections import OrderedDict
 import numpy as np
-from matplotlib.ticker import FuncFormatter
-from PyQt5 import QtWidgets
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from diagnostics import get_logger, stage
 
-def generate_plot(csv_file, return_raw=False):
-    x = []
-    y = []
-
-    with open(csv_file, 'r', encoding='utf-8-sig') as csvfile: 
-        reader = csv.reader(csvfile, delimiter=',')
-        next(reader, None) 
-        for row in reader: 
-            try:
-                x_val = float(row[0])
-                y_val = float(row[1])
-                x.append(x_val)
-                y.append(y_val)
-            except ValueError:
-                print(f"Skipping invalid row: {row}")
-
-    if len(x) == 0 or len(y) == 0:
+log = get_logger("csvRead")
+
+CSV_CACHE_SIZE = 4  # Parsed files kept in memory
+
+_csv_cache = OrderedDict()
+
+class CsvCapture:
+    """
+    Time/current arrays parsed from a capture CSV, with the negative-offset
+    correction for display applied once and analysis results cached.
+    """
+
+    def __init__(self, time_array, current_array):
+        self.time = time_array
+        self.current = current_array
+
+        # --- Correcting for negative offset ---
+        negative = current_array < 0
+        negative_offset = current_array[negative].mean() if negative.any() else 0
+        self.display_current = current_array - negative_offset
+
+        self._analysis = None
+
+    def analysis(self):
+        """(formatted stats, per-pulse DataFrame), computed on first use."""
+        if self._analysis is None:
+            self._analysis = analyze(self.time, self.current)
+        return self._analysis
+
+def parse_csv_arrays(csv_file):
+    """Parses the first two columns of a capture CSV into float arrays, skipping invalid rows."""
+    frame = pd.read_csv(csv_file, usecols=[0, 1], encoding='utf-8-sig')
+    x = pd.to_numeric(frame.iloc[:, 0], errors='coerce').to_numpy(dtype=np.float64)
+    y = pd.to_numeric(frame.iloc[:, 1], errors='coerce').to_numpy(dtype=np.float64)
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.all():
+        log.warning("Skipping %d invalid rows", int((~valid).sum()))
+        x, y = x[valid], y[valid]
+
+    if len(x) == 0:
         raise ValueError("No valid data found in the CSV file.")
+    return x, y
+
+def load_csv_capture(csv_file):
+    """
+    Loads a capture CSV once; later calls for the same unchanged file (path,
+    mtime and size) return the cached CsvCapture without touching its contents.
+    """
+    stat = os.stat(csv_file)
+    key = os.path.abspath(csv_file)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _csv_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        _csv_cache.move_to_end(key)
+        return cached[1]
+
+    capture = CsvCapture(*parse_csv_arrays(csv_file))
+    _csv_cache[key] = (signature, capture)
+    _csv_cache.move_to_end(key)
+    while len(_csv_cache) > CSV_CACHE_SIZE:
+        _csv_cache.popitem(last=False)
+    return capture
+
+def generate_plot(csv_file, return_raw=False):
+    capture = load_csv_capture(csv_file)
+    x = capture.time
+    y = capture.display_current
+
+    if return_raw:
+        return x.tolist(), y.tolist()
 
-    # --- Correcting for negative offset --- 
-    negative_offset = np.mean([val for val in y if val < 0]) if any(val < 0 for val in y) else 0
-    y = [val - negative_offset for val in y] 
+    import matplotlib.pyplot as plt  # Only the standalone plot needs pyplot
+    from matplotlib.ticker import FuncFormatter
 
     x_min, x_max = min(x), max(x)
     y_min, y_max = min(y), max(y)
@@ -59,9 +113,6 @@ def generate_plot(csv_file, return_raw=False):
     ax.xaxis.set_major_formatter(FuncFormatter(scientific_formatter))
     ax.yaxis.set_major_formatter(FuncFormatter(scientific_formatter))
 
-    if return_raw:
-        return x, y
-
     return figure
 
 def format_current(value_in_uA):
@@ -74,70 +125,60 @@ def format_current(value_in_uA):
         return f"{value_in_uA:.4f} uA"
 
 
-def calculate_parameters(data):
-    """Calculates key electrical parameters from a numerical signal dataset."""
-    if data.empty:
-        return None
-
-    numeric_cols = data.select_dtypes(include=['number'])
-    if numeric_cols.shape[1] < 2:
+def compute_pulse_metrics(time_array, current_array):
+    """
+    Computes pulse metrics from time (s) and current (A) arrays in vectorized passes.
+
+    Returns a dict of numbers (None if there is no data):
+    - peak_current (A), peak_time (s)
+    - average_max_current, average_min_current, overshoot, current_rms (uA)
+    - overshoot_percent (%)
+    - pulse_width, settling_time (us)
+    - rising_index, falling_index (first full pulse, None if not found)
+    """
+    time_array = np.asarray(time_array, dtype=np.float64)
+    current_array = np.asarray(current_array, dtype=np.float64)
+    if len(current_array) == 0:
         return None
 
-    # Sort by time
-    data = data.sort_values(by=data.columns[0]).reset_index(drop=True)
-    time_data = numeric_cols.iloc[:, 0]  # time in seconds
-    column_data = numeric_cols.iloc[:, 1]  # current
-
     # Remove negative offset
-    negative_offset = column_data[column_data < 0].mean() if column_data[column_data < 0].any() else 0
-    column_data = column_data - negative_offset
+    negative = current_array < 0
+    negative_offset = current_array[negative].mean() if negative.any() else 0
+    current_array = current_array - negative_offset
 
     # --- Peak and Threshold Calculations ---
-    peak_current = column_data.max()
-    peak_current_time = time_data[column_data.idxmax()]  # Time at which peak current occurs
+    peak_index = int(np.argmax(current_array))
+    peak_current = current_array[peak_index]
+    peak_current_time = time_array[peak_index]  # Time at which peak current occurs
 
-    # Print the results
-    print(f"Peak Current: {peak_current:.6f} A at Time: {peak_current_time:.6f} s")
+    log.debug("Peak Current: %.6f A at Time: %.6f s", peak_current, peak_current_time)
 
-    threshold_10 = 0.1 * peak_current
     threshold_50 = 0.5 * peak_current
     threshold_70 = 0.7 * peak_current
-    threshold_90 = 0.9 * peak_current
 
     # Max current estimate
-    data_for_max = column_data[column_data >= threshold_70]
-    average_max_current = data_for_max.mean() * 1e6  # uA
-    indices_to_exclude = data_for_max.index
+    max_mask = current_array >= threshold_70
+    average_max_current = current_array[max_mask].mean() * 1e6 if max_mask.any() else np.nan  # uA
 
-    # Min current estimate
-    filtered_data_for_min = column_data.drop(indices_to_exclude)
-    average_min_current = filtered_data_for_min.rolling(window=5).min().mean() * 1e6  # uA
+    # Min current estimate: mean of the 5-sample rolling minimum over the remaining samples
+    remaining = current_array[~max_mask]
+    if len(remaining) >= 5:
+        average_min_current = sliding_window_view(remaining, 5).min(axis=1).mean() * 1e6  # uA
+    else:
+        average_min_current = np.nan
 
     # --- Rising and Falling Edge Detection (first full pulse only) ---
-    current_array = column_data.to_numpy()
-    time_array = time_data.to_numpy()
     rising_index = None
     falling_index = None
 
-    for i in range(1, len(current_array) - 1):
-        prev, curr, next_val = current_array[i - 1], current_array[i], current_array[i + 1]
-
-        # Rising edge
-        if rising_index is None and prev < threshold_50 <= curr:
-            rising_index = i
-            continue
-
-        # Falling edge (after rising edge)
-        if rising_index is not None and curr >= threshold_50 > next_val:
-            falling_index = i
-            break
-
-    # --- Print the Falling Index and Time ---
-    if falling_index is not None:
-        falling_time = time_data[falling_index]  # Time at which falling edge occurs
-        print(f"Falling Index: {falling_index}, Time: {falling_time:.6f} s")
-    else:
-        print("No falling edge detected.")
+    prev, curr, next_val = current_array[:-2], current_array[1:-1], current_array[2:]
+    rising = np.flatnonzero((prev < threshold_50) & (threshold_50 <= curr)) + 1
+    if len(rising):
+        rising_index = int(rising[0])
+        falling = np.flatnonzero((curr >= threshold_50) & (threshold_50 > next_val)) + 1
+        falling = falling[falling > rising_index]
+        if len(falling):
+            falling_index = int(falling[0])
 
     # --- Pulse Width ---
     pulse_width = 0
@@ -145,7 +186,7 @@ def calculate_parameters(data):
         pulse_width = (time_array[falling_index] - time_array[rising_index]) * 1e6  # us
 
     # --- RMS Current ---
-    current_rms = np.sqrt(np.mean(column_data**2)) * 1e6  # uA
+    current_rms = np.sqrt(np.mean(current_array ** 2)) * 1e6  # uA
 
     # --- Settling Time (rising edge → last out-of-band before flat-top starts) ---
     settling_time_us = 0
@@ -156,66 +197,263 @@ def calculate_parameters(data):
     OS_percent = 0
 
     if falling_index is not None and rising_index is not None:
-        flat_top_region = column_data.iloc[rising_index:falling_index + 1]
-        diffs = flat_top_region.diff().abs()
+        flat_top = current_array[rising_index:falling_index + 1]
         flat_threshold = 0.001 * peak_current
-        flat_samples = flat_top_region[diffs < flat_threshold]
-        last_flat = flat_samples.tail(N)
+        flat_positions = np.flatnonzero(np.abs(np.diff(flat_top)) < flat_threshold) + 1
+        last_flat_positions = flat_positions[-N:] + rising_index
+        last_flat = current_array[last_flat_positions]
 
         # --- Overshoot Calculation ---
-        settled_target = last_flat.mean() if not last_flat.empty else average_max_current / 1e6  # fallback in A
+        settled_target = last_flat.mean() if len(last_flat) else average_max_current / 1e6  # fallback in A
         overshoot = (peak_current - settled_target) * 1e6  # convert to uA
         OS_percent = (overshoot / (settled_target * 1e6)) * 100 if settled_target > 0 else 0
-     
-        print(f"Using {len(last_flat)} flat-top samples for averaging:")
-        print(last_flat.values)
 
-        if not last_flat.empty:
-            settled_target = last_flat.mean()
+        settling_time_us = 0.0  # fallback if no flat-top was found
+        if len(last_flat):
             upper_bound = settled_target * (1 + tolerance_percent)
             lower_bound = settled_target * (1 - tolerance_percent)
 
-            print(f"Settled target: {settled_target:.6f} A")
-            print(f"±{tolerance_percent*100:.1f}% bounds: {lower_bound:.6f} A to {upper_bound:.6f} A")
-            print(f"Rising index: {rising_index}, Time: {time_array[rising_index]*1e6:.2f} µs")
-
-            # Get index of first flat-top sample (start of the average window)
-            flat_start_index = last_flat.index[0]
+            # Last out-of-band sample between the rising edge and the flat-top average start
+            flat_start_index = int(last_flat_positions[0])
+            window = current_array[rising_index:flat_start_index + 1]
+            out_of_band = np.flatnonzero((window < lower_bound) | (window > upper_bound))
+            last_out_of_band_index = rising_index + int(out_of_band[-1]) if len(out_of_band) else rising_index
 
-            # Walk backward from flat-top average start → rising edge
-            last_out_of_band_index = rising_index
-            for i in range(flat_start_index, rising_index - 1, -1):
-                val = column_data.iloc[i]
-                if val < lower_bound or val > upper_bound:
-                    last_out_of_band_index = i
-                    print(f"Last out-of-band value: {val:.6f} A at index {i}, Time: {time_array[i]*1e6:.2f} µs")
-                    break
-
-        if 'last_out_of_band_index' in locals():
             settling_time_us = (time_array[last_out_of_band_index] - time_array[rising_index]) * 1e6
-        else:
-            settling_time_us = 0.0  # fallback if no out-of-band point was found
-        print(f"✔ Settling time: {settling_time_us:.4f} µs")
+        log.debug("Settling time: %.4f µs", settling_time_us)
 
-    # --- Return Results ---
     return {
-        "Average Maximum Current": format_current(average_max_current),
-        "Average Minimum Current": format_current(average_min_current),
-        "Overshoot": f"{format_current(overshoot)} ({OS_percent:.2f} %)",
-        "Pulse Width": f"{pulse_width:.4f} us",
-        "Current RMS": format_current(current_rms),
-        "Settling Time": f"{settling_time_us:.4f} us"
+        "peak_current": float(peak_current),
+        "peak_time": float(peak_current_time),
+        "average_max_current": float(average_max_current),
+        "average_min_current": float(average_min_current),
+        "overshoot": float(overshoot),
+        "overshoot_percent": float(OS_percent),
+        "pulse_width": float(pulse_width),
+        "current_rms": float(current_rms),
+        "settling_time": float(settling_time_us),
+        "rising_index": rising_index,
+        "falling_index": falling_index,
     }
 
+def format_parameters(metrics):
+    """Formats compute_pulse_metrics output for display in the results table."""
+    return {
+        "Average Maximum Current": format_current(metrics["average_max_current"]),
+        "Average Minimum Current": format_current(metrics["average_min_current"]),
+        "Overshoot": f"{format_current(metrics['overshoot'])} ({metrics['overshoot_percent']:.2f} %)",
+        "Pulse Width": f"{metrics['pulse_width']:.4f} us",
+        "Current RMS": format_current(metrics["current_rms"]),
+        "Settling Time": f"{metrics['settling_time']:.4f} us"
+    }
 
+def calculate_parameters(data):
+    """Calculates key electrical parameters from a numerical signal dataset."""
+    arrays = numeric_arrays(data)
+    if arrays is None:
+        return None
 
-def populate_table(tableWidget, data):
-    """Populates a QTableWidget with predefined current parameters."""
-    stats = calculate_parameters(data)
-    if not stats:
-        QtWidgets.QMessageBox.warning(None, "Error", "No numerical data found in the file.")
-        return
+    time_array, current_array = arrays  # time in seconds, current in A
+    with stage("metrics", len(current_array)):
+        metrics = compute_pulse_metrics(time_array, current_array)
+        if metrics is None:
+            return None
+        return format_parameters(metrics)
 
+
+
+def numeric_arrays(data):
+    """First two numeric DataFrame columns as (time, current) float arrays, or None."""
+    if data.empty:
+        return None
+    numeric_cols = data.select_dtypes(include=['number'])
+    if numeric_cols.shape[1] < 2:
+        return None
+    return (numeric_cols.iloc[:, 0].to_numpy(dtype=np.float64),
+            numeric_cols.iloc[:, 1].to_numpy(dtype=np.float64))
+
+def hysteresis_state(current_array, high, low):
+    """
+    Boolean pulse state per sample: turns on at >= high, off at <= low and
+    holds its previous value in between. Starts off unless the first sample is high.
+    """
+    idx = np.arange(len(current_array))
+    event = np.where((current_array >= high) | (current_array <= low), idx, -1)
+    last_event = np.maximum.accumulate(event)
+    state = np.zeros(len(current_array), dtype=bool)
+    seen = last_event >= 0
+    state[seen] = current_array[last_event[seen]] >= high
+    return state
+
+PULSE_COLUMNS = [
+    "Start Time (s)", "Pulse Width (us)", "Amplitude (uA)", "Peak Current (uA)",
+    "Overshoot (uA)", "Overshoot (%)", "Settling Time (us)", "Period (us)"
+]
+
+def measure_pulses(time_array, current_array, hysteresis=0.1, tolerance_percent=0.03, min_samples=3):
+    """
+    Detects every complete pulse in a capture and measures each one.
+
+    Edges use a hysteresis band of ±hysteresis/2 around 50 % of the peak. For each
+    pulse the amplitude is the mean of its second half, the peak current is the
+    maximum over the whole pulse, overshoot is that peak above the amplitude, and
+    settling time runs from the rising edge to the last sample in the first half
+    outside ±tolerance_percent of the amplitude.
+
+    Returns:
+    - DataFrame with one row per pulse (PULSE_COLUMNS), empty if none were found
+    """
+    time_array = np.asarray(time_array, dtype=np.float64)
+    current_array = np.asarray(current_array, dtype=np.float64)
+    empty = pd.DataFrame(columns=PULSE_COLUMNS)
+    if len(current_array) < min_samples:
+        return empty
+
+    # Remove negative offset (same correction as compute_pulse_metrics)
+    negative = current_array < 0
+    if negative.any():
+        current_array = current_array - current_array[negative].mean()
+
+    peak = current_array.max()
+    if not peak > 0:
+        return empty
+
+    state = hysteresis_state(current_array, 0.5 * peak * (1 + hysteresis), 0.5 * peak * (1 - hysteresis))
+    steps = np.diff(state.astype(np.int8))
+    rising = np.flatnonzero(steps == 1) + 1  # first high sample
+    falling = np.flatnonzero(steps == -1)  # last high sample
+
+    # Only complete pulses: drop a pulse already high at the start and one still high at the end
+    if len(rising) == 0:
+        return empty
+    falling = falling[falling >= rising[0]]
+    count = min(len(rising), len(falling))
+    rising, falling = rising[:count], falling[:count]
+
+    keep = falling - rising + 1 >= min_samples
+    rising, falling = rising[keep], falling[keep]
+    if len(rising) == 0:
+        return empty
+
+    # Segment boundaries: [rising, mid) = settling half, [mid, falling) = amplitude half
+    mid = rising + (falling - rising + 1) // 2
+    padded = np.append(current_array, 0.0)
+    bounds = np.column_stack((rising, mid, falling)).ravel()
+
+    peak_current = np.maximum.reduceat(padded, np.column_stack((rising, falling + 1)).ravel())[0::2]
+    amplitude = np.add.reduceat(padded, bounds)[1::3] / (falling - mid)
+
+    # Last out-of-band sample in each settling half
+    lengths = falling - rising + 1
+    starts = np.cumsum(lengths) - lengths
+    pulse_samples = np.repeat(rising - starts, lengths) + np.arange(lengths.sum())
+    target = np.repeat(amplitude, lengths)
+    out_of_band = np.abs(current_array[pulse_samples] - target) > target * tolerance_percent
+    marked = np.full(len(padded), -1, dtype=np.int64)
+    marked[pulse_samples[out_of_band]] = pulse_samples[out_of_band]
+    last_out_of_band = np.maximum.reduceat(marked, bounds)[0::3]
+    settle_index = np.where(last_out_of_band >= 0, last_out_of_band, rising)
+
+    start_time = time_array[rising]
+    overshoot = (peak_current - amplitude) * 1e6
+    period = np.append(np.diff(start_time), np.nan) * 1e6
+
+    return pd.DataFrame({
+        "Start Time (s)": start_time,
+        "Pulse Width (us)": (time_array[falling] - start_time) * 1e6,
+        "Amplitude (uA)": amplitude * 1e6,
+        "Peak Current (uA)": peak_current * 1e6,
+        "Overshoot (uA)": overshoot,
+        "Overshoot (%)": np.where(amplitude > 0, overshoot / (amplitude * 1e6) * 100, 0.0),
+        "Settling Time (us)": (time_array[settle_index] - start_time) * 1e6,
+        "Period (us)": period,
+    })
+
+def summarize_pulses(pulses):
+    """
+    Aggregate distribution of every per-pulse column: count, mean, std, min,
+    5th/50th/95th percentiles and max. The std of "Period (us)" is the period jitter.
+    """
+    rows = {}
+    for column in PULSE_COLUMNS[1:]:
+        values = pulses[column].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            rows[column] = [0] + [np.nan] * 7
+            continue
+        p5, p50, p95 = np.percentile(values, [5, 50, 95])
+        rows[column] = [len(values), values.mean(), values.std(), values.min(), p5, p50, p95, values.max()]
+    return pd.DataFrame.from_dict(rows, orient='index',
+                                  columns=["Count", "Mean", "Std", "Min", "P5", "Median", "P95", "Max"])
+
+def format_pulse_summary(pulses):
+    """Results-table rows summarizing all pulses in the capture."""
+    if pulses.empty:
+        return {"Pulse Count": "0"}
+
+    summary = summarize_pulses(pulses)
+
+    def spread(column, unit):
+        return f"{summary.at[column, 'Mean']:.4f} ± {summary.at[column, 'Std']:.4f} {unit}"
+
+    rows = {
+        "Pulse Count": str(len(pulses)),
+        "Pulse Width (all pulses)": spread("Pulse Width (us)", "us"),
+        "Amplitude (all pulses)": f"{format_current(summary.at['Amplitude (uA)', 'Mean'])} ± {format_current(summary.at['Amplitude (uA)', 'Std'])}",
+        "Overshoot (all pulses)": spread("Overshoot (%)", "%"),
+        "Settling Time (all pulses)": spread("Settling Time (us)", "us"),
+    }
+    if summary.at["Period (us)", "Count"] > 0:
+        rows["Period (all pulses)"] = f"{summary.at['Period (us)', 'Mean']:.4f} us"
+        rows["Period Jitter (std)"] = f"{summary.at['Period (us)', 'Std']:.4f} us"
+    return rows
+
+def export_pulse_table(pulses, file_path):
+    """Writes the per-pulse table to file_path and its summary next to it (<name>_summary.csv)."""
+    pulses.to_csv(file_path, index_label="Pulse")
+    root, ext = file_path.rsplit('.', 1) if '.' in file_path else (file_path, 'csv')
+    summary_path = f"{root}_summary.{ext}"
+    summarize_pulses(pulses).to_csv(summary_path, index_label="Metric")
+    return summary_path
+
+def analyze(time_array, current_array):
+    """Formatted table stats (None without data) and the per-pulse DataFrame for a capture."""
+    with stage("metrics", len(current_array)):
+        metrics = compute_pulse_metrics(time_array, current_array)
+        if metrics is None:
+            return None, None
+
+        pulses = measure_pulses(time_array, current_array)
+        stats = format_parameters(metrics)
+        stats.update(format_pulse_summary(pulses))
+        return stats, pulses
+
+def capture_metrics(time_array, current_array):
+    """
+    GUI-free metrics for batch use: a flat dict of numbers (compute_pulse_metrics
+    plus the all-pulse summary) and the per-pulse DataFrame. Metrics are None
+    when the capture holds no data.
+    """
+    with stage("metrics", len(current_array)):
+        metrics = compute_pulse_metrics(time_array, current_array)
+        if metrics is None:
+            return None, None
+        metrics = {name: value for name, value in metrics.items() if not name.endswith("_index")}
+
+        pulses = measure_pulses(time_array, current_array)
+        metrics["pulse_count"] = len(pulses)
+        if not pulses.empty:
+            summary = summarize_pulses(pulses)
+            for column, key in [("Pulse Width (us)", "pulse_width_all"), ("Amplitude (uA)", "amplitude_all"),
+                                ("Overshoot (%)", "overshoot_percent_all"),
+                                ("Settling Time (us)", "settling_time_all"), ("Period (us)", "period_all")]:
+                metrics[f"{key}_mean"] = float(summary.at[column, "Mean"])
+                metrics[f"{key}_std"] = float(summary.at[column, "Std"])
+        return metrics, pulses
+
+def fill_table(tableWidget, stats):
+    """Writes formatted parameters into a QTableWidget."""
+    from PyQt5 import QtWidgets
     tableWidget.setRowCount(len(stats))
     tableWidget.setColumnCount(2)
     tableWidget.setHorizontalHeaderLabels(["Parameter", "Value"])
@@ -230,4 +468,20 @@ def populate_table(tableWidget, data):
         tableWidget.setItem(row, 0, QtWidgets.QTableWidgetItem(param))  
         tableWidget.setItem(row, 1, QtWidgets.QTableWidgetItem(value))
 
-    tableWidget.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
\ No newline at end of file
+    tableWidget.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+
+def populate_table(tableWidget, data):
+    """
+    Populates a QTableWidget with predefined current parameters plus a summary
+    over every pulse in the capture. Returns (formatted stats, per-pulse DataFrame),
+    both None without numerical data.
+    """
+    from PyQt5 import QtWidgets
+    arrays = numeric_arrays(data)
+    stats, pulses = analyze(*arrays) if arrays is not None else (None, None)
+    if not stats:
+        QtWidgets.QMessageBox.warning(None, "Error", "No numerical data found in the file.")
+        return None, None
+
+    fill_table(tableWidget, stats)
+    return stats, pulses
@@ -1,26 +1,50 @@
-﻿import serial
-import time
+﻿import time
+_import_start = time.perf_counter()  # Cold-start import cost, reported in diagnostics
+
+import serial
+import sys
 import csv
 import threading
+import queue
 import subprocess
 import tkinter as tk
-from PyQt5.QtCore import QTimer, pyqtSignal, QObject
-from PyQt5.QtWidgets import QApplication, QMainWindow
-import TeeSenseGUI
 import numpy as np
 from tkinter import filedialog, messagebox
 from tkinter import StringVar, IntVar
 from PIL import Image, ImageTk
 from ttkbootstrap import Style
 from ttkbootstrap.constants import *
-from ttkbootstrap.widgets import Frame, LabelFrame, Button, Label, Combobox
+from ttkbootstrap.widgets import Frame, LabelFrame, Button, Label, Combobox, Checkbutton
 
-from ByteCombine import process_filtered_data, process_unfiltered_data
-from csvRead import calculate_parameters, populate_table
-from TeeSenseGUI import start_tkinter_window
+from ByteCombine import process_filtered_data, process_unfiltered_data, TRIGGER_EDGES
+from serialCapture import (open_port, start_capture, capture_samples, capture_zero, capture_triggered,
+                           iter_frame_chunks, frames_to_rows, SimulatedSerial, list_ports, PortWatcher)
+from captureFile import new_recording, recover_recordings, RECORDINGS_DIR
+from diagnostics import configure_logging, diagnostics, get_logger
 import ByteCombine
 
+# Qt, matplotlib, pandas and the plotting UI (TeeSenseGUI, csvRead) are only needed once a
+# capture finishes; they are imported by prewarm_analysis_modules() or on first use.
+ANALYSIS_MODULES = ["PyQt5.QtWidgets", "pandas", "matplotlib.figure", "csvRead", "TeeSenseGUI", "liveScope"]
+PREWARM_DELAY_MS = 500  # Let the window finish drawing before the background import starts
+DC_BIAS_SECONDS = 60  # Longest DC Bias measurement
+UI_PUMP_INTERVAL_MS = 15  # Tk drives the Qt event loop and queued worker calls at this interval
+
 root = None
+ser = None
+
+# One QApplication and analysis window for the whole session, created on the first capture
+qt_app = None
+analysis_window = None
+analysis_ui = None
+live_window = None
+live_buffer = None
+live_thread = None
+live_stop = threading.Event()  # Ends the live stream only; captures use stop_thread
+live_closed_port = False  # The last live stream closed the port; the next reader reopens it
+ui_calls = queue.Queue()  # (fn, args) queued by worker threads for the Tk thread
+log = get_logger("dataCollect")
+diagnostics.record("import:dataCollect", time.perf_counter() - _import_start)
 
 def generate_fake_pulse_data(filtered=True):
     t = np.linspace(0, 0.001, 1000)  # 1 ms total, 1000 samples
@@ -69,84 +93,203 @@ def show_about_window():
     Label(about, text=description, wraplength=440, justify="left", padding=20).pack()
     Button(about, text="Close", command=about.destroy, bootstyle="secondary").pack(pady=10)
 
+PORT_EVENT_POLL_MS = 200  # How often the Tk loop picks up results from the port watcher
+
+port_watcher = None
+port_events = queue.Queue()  # (ports, forced) from the PortWatcher thread, applied on the Tk thread
+
+
 def get_available_ports():
-    ports = []
-    for i in range(1, 256):
-        port = f'COM{i}'
-        try:
-            ser_test = serial.Serial(port)
-            ser_test.close()
-            ports.append(port)
-        except serial.SerialException:
-            continue
-    return ports
+    return list_ports()
 
 
 def refresh_ports():
-    ports = get_available_ports()
-    port_combobox["values"] = ports
-    port_combobox.set("")
-    update_status("Ports refreshed", "info")
+    update_status("Scanning ports...", "info")
+    port_watcher.rescan()
+
+
+def start_port_watcher():
+    """Enumerates ports off the UI thread and keeps port_combobox in sync with hot-plug events."""
+    global port_watcher
+    port_watcher = PortWatcher(lambda ports, forced: port_events.put((ports, forced))).start()
+    root.after(PORT_EVENT_POLL_MS, apply_port_events)
+
+
+def apply_port_events():
+    previous = list(port_combobox["values"])
+    update = None
+    while True:
+        try:
+            update = port_events.get_nowait()
+        except queue.Empty:
+            break
+
+    if update is not None:
+        ports, forced = update
+        port_combobox["values"] = ports
+        added = [p for p in ports if p not in previous]
+        removed = [p for p in previous if p not in ports]
+        connected = ser is not None and ser.is_open
+
+        if port_combobox.get() not in ports:
+            port_combobox.set("")
+        if not port_combobox.get() and len(added) == 1:
+            port_combobox.set(added[0])
+
+        if forced:
+            update_status("Ports refreshed", "info")
+        elif removed and not connected:
+            update_status(f"Device removed: {', '.join(removed)}", "warning")
+        elif added and previous and not connected:
+            update_status(f"Device detected: {', '.join(added)}", "info")
+
+    root.after(PORT_EVENT_POLL_MS, apply_port_events)
 
 
 def read_from_serial():
         global data
         data = []
-        buffer = b""
-        first_line_skipped = False
-        sample_index = 0
 
-        print(f"[Reading] Starting, data = {data[:5]}")
+        protocol = protocol_var.get()
+        log.info("Starting %s capture of %d samples", protocol, sample_count)
+
+        try:
+            recorder = new_recording(filter_var.get()) if record_var.get() else None
+            try:
+                frames = capture_samples(ser, sample_count, binary=(protocol == "Binary"),
+                                         should_stop=lambda: stop_thread,
+                                         on_frames=recorder.write if recorder else None)
+            finally:
+                if recorder:
+                    path = recorder.close()
+                    log.info("Recorded %d samples to %s", recorder.sample_count, path)
+
+            if len(frames) < sample_count:
+                log.warning("Capture stopped after %d samples", len(frames))
+                return
+
+            data = frames_to_rows(frames)
+
+            retake_settings = {
+                "port": ser.port,
+                "samples": sample_count,
+                "filter_mode": filter_var.get(),
+                "protocol": protocol,
+                "record": bool(record_var.get())
+            }
+
+            log.info("Sample count reached, launching GUI")
+            ser.close()
+
+            # Process here on the capture thread; only the hand-over touches the GUI
+            processed = process_capture(data, retake_settings["filter_mode"])
+            run_on_ui_thread(process_and_launch_gui, data, retake_settings, processed)
+        except Exception as e:
+            log.error("Error during serial read: %s", e)
+
+def read_triggered(trigger):
+        """Waits for one trigger event and hands the pre/post-trigger window to the analysis window."""
+        protocol = protocol_var.get()
+        log.info("Waiting for %s trigger at %.6f A ±%.6f A (%d pre / %d post samples)", trigger["edge"],
+                 trigger["level"], trigger["hysteresis"], trigger["pre"], trigger["post"])
+
+        try:
+            windows = capture_triggered(ser, trigger["level"], trigger["edge"], trigger["pre"], trigger["post"],
+                                        binary=(protocol == "Binary"), should_stop=lambda: stop_thread,
+                                        hysteresis=trigger["hysteresis"])
+            if not windows:
+                log.warning("Triggered capture stopped before a trigger event")
+                return
+
+            frames = windows[0]
+            if record_var.get():
+                recorder = new_recording(filter_var.get())
+                recorder.write(frames)
+                path = recorder.close()
+                log.info("Recorded %d samples to %s", recorder.sample_count, path)
+
+            # Trigger sample at t = 0
+            data = frames_to_rows(frames, start_time=-trigger["pre"] * ByteCombine.SAMPLE_PERIOD)
+
+            retake_settings = {
+                "port": ser.port,
+                "samples": len(frames),
+                "filter_mode": filter_var.get(),
+                "protocol": protocol,
+                "record": bool(record_var.get()),
+                "trigger": trigger
+            }
+
+            log.info("Trigger captured, launching GUI")
+            ser.close()
+
+            processed = process_capture(data, retake_settings["filter_mode"])
+            run_on_ui_thread(process_and_launch_gui, data, retake_settings, processed)
+        except Exception as e:
+            log.error("Error during triggered read: %s", e)
 
-        SAMPLE_RATE = 1_220_000  # Hz
-        SAMPLE_PERIOD = 1 / SAMPLE_RATE  # ~819.67 ns
+def read_dc_bias(binary, record):
+        """Streams up to 60 s into running statistics and hands the bias trace to the analysis window."""
+        log.info("Starting DC Bias read")
+        timeout = DC_BIAS_SECONDS
+        last_update = [0.0]
+
+        def show_live_bias(stats):
+            # Throttle status updates; the stream itself never waits on the UI
+            now = time.time()
+            if now - last_update[0] >= 0.25:
+                last_update[0] = now
+                run_on_ui_thread(update_status, f"DC Bias: {stats.mean:.6f} A ({stats.count} samples)", "info")
 
         try:
-            while not stop_thread:
-                if ser.in_waiting > 0:
-                    buffer += ser.read(ser.in_waiting)
-
-                    while b'\n' in buffer:
-                        line, buffer = buffer.split(b'\n', 1)
-
-                        decoded = line.decode('utf-8').strip()
-                        parts = list(map(int, decoded.split()))
-
-                        if not first_line_skipped:
-                            print(f"Skipping first timing line: {parts}")
-                            first_line_skipped = True
-                            continue
-
-                        if len(parts) != 4:
-                            print(f"Skipping malformed line: {parts}")
-                            continue
-
-                        # Use fixed time step based on sample index
-                        timestamp_s = sample_index * SAMPLE_PERIOD
-                        data.append([timestamp_s] + parts)
-                        sample_index += 1
-
-                        retake_settings = {
-                            "port": ser.port,
-                            "samples": sample_count,
-                            "filter_mode": filter_var.get()
-                        }
-
-                        if len(data) >= sample_count:
-                            print("Sample count reached, launching GUI")
-                            ser.close()
-
-                            # First, call the Qt-based GUI
-                            try:
-                                print("Calling process_and_launch_gui()...")
-                                process_and_launch_gui(data, retake_settings)
-                                print("Returned from process_and_launch_gui()")
-                            except Exception as e:
-                                print(f"Error in process_and_launch_gui: {e}")
-
-                            return  # End the function to continue the program
+            chunks = iter_frame_chunks(ser, timeout, binary, lambda: stop_thread)
+            recorder = new_recording("DC Bias") if record else None
+            try:
+                stats = ByteCombine.stream_dc_bias(recorder.tee(chunks) if recorder else chunks,
+                                                   on_update=show_live_bias)
+            finally:
+                if recorder:
+                    path = recorder.close()
+                    log.info("Recorded %d samples to %s", recorder.sample_count, path)
+
+            ser.close()
+
+            if stats.count == 0:
+                run_on_ui_thread(messagebox.showerror, "Error", "No data collected in DC Bias mode.")
+                return
+
+            log.info("Calculated DC Bias: %.6f A from %d samples (std %.6f A, min %.6f A, max %.6f A)",
+                     stats.mean, stats.count, stats.std, stats.min, stats.max)
+
+            retake_settings = {
+                "port": ser.port,
+                "filter_mode": "DC Bias",
+                "protocol": "Binary" if binary else "ASCII",
+                "record": record
+            }
+
+            run_on_ui_thread(process_and_launch_gui, None, retake_settings, ByteCombine.dc_bias_trace(stats))
         except Exception as e:
-            print(f"Error during serial read: {e}")
+            if stop_thread:
+                log.info("DC Bias read stopped: %s", e)  # Stop closed the port under the read
+                return
+            log.error("Error during DC Bias read: %s", e)
+            run_on_ui_thread(messagebox.showerror, "Error", f"DC Bias mode failed:\n{e}")
+
+def measure_read_throughput(sample_count=100_000):
+    """Times both protocol readers against SimulatedSerial and reports samples per second."""
+    pulse = np.array(generate_fake_pulse_data(), dtype=np.float64)[:, 1:5]
+    frames = np.tile(pulse, (-(-sample_count // len(pulse)), 1))[:sample_count]
+
+    results = {}
+    for protocol in ("ASCII", "Binary"):
+        sim = SimulatedSerial(frames, binary=(protocol == "Binary"))
+        start = time.perf_counter()
+        captured = capture_samples(sim, sample_count, binary=(protocol == "Binary"))
+        elapsed = time.perf_counter() - start
+        results[protocol] = len(captured) / elapsed if elapsed > 0 else float('inf')
+        print(f"{protocol}: {len(captured)} samples in {elapsed:.3f} s → {results[protocol]:,.0f} samples/s")
+    return results
  
 
 def write_data_to_csv(data, filename):
@@ -156,39 +299,165 @@ def write_data_to_csv(data, filename):
             if file.tell() == 0:
                 writer.writerow(["Time", "Byte1", "Byte2", "Byte3", "Byte4"])
             writer.writerows(data)
-            print(f"Saved {len(data)} entries to {filename}.")
+            log.info("Saved %d entries to %s.", len(data), filename)
     except Exception as e:
-        print(f"CSV write error: {e}")
-
-def process_and_launch_gui(data, retake_settings=None):
+        log.error("CSV write error: %s", e)
 
-    root.withdraw()
-
-    selected_filter = filter_var.get()
-    print(f"Selected filter: '{selected_filter}'")  # <-- Add this
+def process_capture(data, selected_filter):
+    """Applies the selected processing to captured rows. Returns (x_data, y_data)."""
+    log.debug("Selected filter: '%s'", selected_filter)
 
     if selected_filter == "Filtered":
-        print(f"process_filtered_data called")
-        x_data, y_data = process_filtered_data(data, return_data=True)
+        log.debug("process_filtered_data called")
+        return process_filtered_data(data, return_data=True)
     elif selected_filter == "Unfiltered":
-        x_data, y_data = process_unfiltered_data(data, return_data=True)
+        return process_unfiltered_data(data, return_data=True)
     elif selected_filter == "DC Bias":
         from ByteCombine import process_dc_bias_data
-        print(f"baseline_adc_value before DC bias calc: {ByteCombine.baseline_adc_value}")
-        x_data, y_data = process_dc_bias_data(data, return_data=True)
+        log.debug("baseline_adc_value before DC bias calc: %s", ByteCombine.baseline_adc_value)
+        return process_dc_bias_data(data, return_data=True)
     else:
         raise ValueError("Unknown filter option selected")
 
-    from PyQt5.QtWidgets import QApplication, QMainWindow
-    from TeeSenseGUI import Ui_MainWindow
+def process_and_launch_gui(data, retake_settings=None, processed=None):
+    """Hands a capture to the analysis window in memory. Must run on the Tk thread."""
+    root.withdraw()
+
+    selected_filter = filter_var.get()
+    if processed is None:
+        processed = process_capture(data, selected_filter)
+    x_data, y_data = processed
+
+    ui = get_analysis_window()
+    trigger = (retake_settings or {}).get("trigger")
+    if trigger and not ui.trigger_threshold.text().strip():
+        # Align the plot on the acquisition trigger
+        ui.trigger_threshold.setText(f"{trigger['level']:g}")
+        ui.trigger_edge.setCurrentText(trigger["edge"])
+        if trigger["hysteresis"]:
+            ui.trigger_hysteresis.setText(f"{trigger['hysteresis']:g}")
+    raw_frames = np.asarray(data)[:, 1:5] if data is not None and len(data) else None
+    ui.load_direct_data(x_data, y_data, filtered=(selected_filter == "Filtered"), retake_settings=retake_settings,
+                        raw_frames=raw_frames)
+    analysis_window.show()
+    analysis_window.raise_()
+    analysis_window.activateWindow()
+
+def get_analysis_window():
+    """
+    Creates the QApplication and analysis window on first use; later captures
+    reuse them, so back-to-back captures skip Qt and matplotlib setup.
+    """
+    global analysis_window, analysis_ui
+    if analysis_ui is None:
+        from TeeSenseGUI import AnalysisWindow, Ui_MainWindow
+
+        get_qt_app()
+        analysis_window = AnalysisWindow()
+        analysis_ui = Ui_MainWindow()
+        analysis_ui.setupUi(analysis_window)
+        analysis_ui.show_data_collect = show_logger_window
+        analysis_window.closed.connect(show_logger_window)
+    return analysis_ui
+
+def get_qt_app():
+    global qt_app
+    if qt_app is None:
+        from PyQt5.QtWidgets import QApplication
+        qt_app = QApplication.instance() or QApplication(sys.argv)
+        qt_app.setQuitOnLastWindowClosed(False)  # The Tk logger window owns the session
+    return qt_app
+
+def get_live_window():
+    """Creates the live scope window and its ring buffer once per session."""
+    global live_window, live_buffer
+    if live_window is None:
+        from liveScope import LiveScopeWindow, RingBuffer
+
+        get_qt_app()
+        live_buffer = RingBuffer()
+        live_window = LiveScopeWindow(live_buffer)
+        live_window.closed.connect(stop_live_view)
+    return live_window
+
+def stream_live(binary, recorder=None):
+    """
+    Live mode capture thread: converts each serial chunk and drops it into the
+    ring buffer. The view redraws on its own timer, so this loop never waits on it.
+    """
+    global live_closed_port
+    try:
+        chunks = iter_frame_chunks(ser, None, binary, live_stop.is_set)
+        for frames in recorder.tee(chunks) if recorder else chunks:
+            live_buffer.extend(ByteCombine.convert_frames(frames))
+    except Exception as e:
+        log.error("Error during live view: %s", e)
+    finally:
+        if recorder:
+            path = recorder.close()
+            log.info("Recorded %d samples to %s", recorder.sample_count, path)
+        # Closed here, once no read is in flight
+        if ser and ser.is_open:
+            ser.close()
+            live_closed_port = True
+
+def stop_live_view():
+    live_stop.set()
+
+def end_live_stream(reopen=True):
+    """
+    Stops a running live stream and waits until it has left its read (no
+    timeout: a late exit would close the port under the next reader), then
+    reopens the port the stream closed on its way out.
+    """
+    global live_closed_port
+    if live_thread is not None and live_thread.is_alive():
+        live_stop.set()
+        live_thread.join()
+    if reopen and live_closed_port and ser and not ser.is_open:
+        ser.open()
+    live_closed_port = False
+
+def show_logger_window():
+    root.deiconify()
+    root.lift()
+
+def run_on_ui_thread(fn, *args):
+    """Queues fn(*args) for the Tk thread; worker threads must not touch Tk or Qt widgets."""
+    ui_calls.put((fn, args))
+
+def pump_ui_events():
+    """Runs queued worker calls and pending Qt events, so one Tk loop drives both toolkits."""
+    while True:
+        try:
+            fn, args = ui_calls.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            fn(*args)
+        except Exception as e:
+            log.error("Error in %s: %s", getattr(fn, "__name__", fn), e)
+
+    if qt_app is not None:
+        qt_app.processEvents()
+    root.after(UI_PUMP_INTERVAL_MS, pump_ui_events)
+
+def prewarm_analysis_modules():
+    """Imports the plotting/analysis stack on a background thread while the operator connects."""
+    def worker():
+        import importlib
+        start = time.perf_counter()
+        for name in ANALYSIS_MODULES:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                log.warning("Pre-warm import of %s failed: %s", name, e)
+        elapsed = time.perf_counter() - start
+        diagnostics.record("import:analysis", elapsed)
+        log.info("Analysis modules pre-warmed in %.3f s", elapsed)
+
+    threading.Thread(target=worker, daemon=True).start()
 
-    app = QApplication([])
-    MainWindow = QMainWindow()
-    ui = Ui_MainWindow()
-    ui.setupUi(MainWindow)
-    ui.load_direct_data(x_data, y_data, filtered=(selected_filter == "Filtered"), retake_settings=retake_settings)
-    MainWindow.show()
-    app.exec_()
 
 def update_status(message, status_type="info"):
     status_label.config(text=message)
@@ -199,10 +468,17 @@ def show_reading_buttons():
     start_button.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
     zero_button.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
     stop_button.grid(row=0, column=2, padx=10, pady=10, sticky="ew")
+    live_button.grid(row=0, column=3, padx=10, pady=10, sticky="ew")
 
 def on_close_tkinter():
     """Close the entire program when the Tkinter window is closed."""
-    print("Tkinter window closed, exiting program...")
+    log.info("Tkinter window closed, exiting program...")
+    live_stop.set()
+    if port_watcher:
+        port_watcher.stop()
+    if analysis_window is not None:
+        analysis_window.closed.disconnect()
+        analysis_window.close()
     root.quit()
     root.destroy()
 
@@ -211,7 +487,7 @@ def create_tkinter_gui():
     root = tk.Tk()
     style = Style("flatly")  # Light theme
     root.title("TeeSense USB Data Logger")
-    root.geometry("800x500")  # Or wider if needed
+    root.geometry("800x560")  # Or wider if needed
     root.resizable(False, False)
     root.columnconfigure(1, weight=1)
 
@@ -219,14 +495,24 @@ def create_tkinter_gui():
     root.protocol("WM_DELETE_WINDOW", on_close_tkinter)
 
     start_main_application(root)
+
+    def report_startup():
+        elapsed = time.perf_counter() - _import_start
+        diagnostics.record("startup:dataCollect", elapsed)
+        log.info("Logger window ready in %.3f s", elapsed)
+        root.after(PREWARM_DELAY_MS, prewarm_analysis_modules)
+
+    root.after_idle(report_startup)
+    root.after(UI_PUMP_INTERVAL_MS, pump_ui_events)
     root.mainloop()
 
 
 def start_main_application(root):
-    global port_combobox, start_button, stop_button, zero_button, status_label, sample_entry, time_estimate_label, num_samples
+    global port_combobox, start_button, stop_button, zero_button, live_button, status_label, sample_entry, time_estimate_label, num_samples
 
     def disconnect_port():
         try:
+            end_live_stream(reopen=False)
             if ser.is_open:
                 ser.close()
                 update_status("Disconnected", "danger")
@@ -266,7 +552,7 @@ def start_main_application(root):
         logo_label.image = logo
         logo_label.grid(row=0, column=0, sticky="w", padx=(0, 10))
     except Exception as e:
-        print(f"Logo load error: {e}")
+        log.warning("Logo load error: %s", e)
 
     # Title (column 1)
     title = Label(header, text="TeeSense Current Capture", font=("Roboto", 25, "bold"))
@@ -307,9 +593,7 @@ def start_main_application(root):
             global ser
             try:
                 # Open the COM port connection
-                ser = serial.Serial(port, 115200, parity=serial.PARITY_NONE,
-                                    bytesize=serial.EIGHTBITS, timeout=1)
-                ser.flushInput()
+                ser = open_port(port)
             
                 # Update the UI status
                 update_status(f"Connected: {port}", "success")
@@ -329,7 +613,7 @@ def start_main_application(root):
             # Show warning if no port is selected
             messagebox.showwarning("Port Missing", "Please select a port.")
 
-    port_combobox = Combobox(port_frame, values=get_available_ports(), width=15, state="readonly")
+    port_combobox = Combobox(port_frame, values=[], width=15, state="readonly")  # Filled by the port watcher
     port_combobox.grid(row=0, column=1, padx=(0, 5), pady=5, sticky="w")
 
     refresh_btn = Button(port_frame, text="Refresh", command=refresh_ports, bootstyle="info-outline")
@@ -402,16 +686,59 @@ def start_main_application(root):
         state="readonly", width=15)
     filter_dropdown.grid(row=1, column=1, padx=(0, 5), pady=5, sticky="w")
 
+    Label(sample_frame, text="Protocol:").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+
+    global protocol_var
+    protocol_var = StringVar(value="ASCII")  # ASCII is the fallback for older firmware
+    protocol_dropdown = Combobox(sample_frame, textvariable=protocol_var,
+        values=["ASCII", "Binary"],
+        state="readonly", width=15)
+    protocol_dropdown.grid(row=2, column=1, padx=(0, 5), pady=5, sticky="w")
+
+    # Stream raw samples to recordings/*.tsc while capturing
+    global record_var
+    record_var = IntVar(value=0)
+    Checkbutton(sample_frame, text="Record to disk", variable=record_var,
+                bootstyle="round-toggle").grid(row=3, column=1, padx=(0, 5), pady=5, sticky="w")
+
+    # Triggered mode keeps only pre/post samples around a level crossing; Free Run uses Number of Samples
+    Label(sample_frame, text="Trigger:").grid(row=4, column=0, padx=5, pady=5, sticky="e")
+    trigger_var = StringVar(value="Free Run")
+    Combobox(sample_frame, textvariable=trigger_var, values=["Free Run"] + TRIGGER_EDGES,
+             state="readonly", width=15).grid(row=4, column=1, padx=(0, 5), pady=5, sticky="w")
+
+    trigger_frame = Frame(sample_frame)
+    trigger_frame.grid(row=4, column=2, columnspan=2, padx=(0, 5), pady=5, sticky="w")
+    trigger_level = StringVar(value="0.05")
+    trigger_hysteresis = StringVar(value="0")
+    trigger_pre = StringVar(value="1000")
+    trigger_post = StringVar(value="4000")
+    for column, (text, variable) in enumerate([("Level (A):", trigger_level), ("Hyst. (A):", trigger_hysteresis),
+                                               ("Pre:", trigger_pre), ("Post:", trigger_post)]):
+        Label(trigger_frame, text=text).grid(row=0, column=2 * column, padx=(0, 3), sticky="e")
+        tk.Entry(trigger_frame, width=8, textvariable=variable).grid(row=0, column=2 * column + 1, padx=(0, 8))
+
+    def read_trigger_settings():
+        """Trigger settings from the form, or None in Free Run. Raises ValueError on invalid input."""
+        if trigger_var.get() == "Free Run":
+            return None
+        trigger = {
+            "level": float(trigger_level.get()),
+            "edge": trigger_var.get(),
+            "hysteresis": float(trigger_hysteresis.get() or 0),
+            "pre": int(trigger_pre.get()),
+            "post": int(trigger_post.get())
+        }
+        if trigger["pre"] < 0 or trigger["post"] <= 0:
+            raise ValueError
+        return trigger
+
     from tkinter import messagebox
 
     # --- Filter Mode Change Handler ---
     def filter_mode_changed(*args):
-        dc_bias_message_label = Label(sample_frame, text="Warning: DC biasing plot takes ~50 seconds to load", foreground="red")
-        # Show or hide the message when "DC Bias" is selected
         if filter_var.get() == "DC Bias":
-            messagebox.showinfo("DC Bias Selected", "Warning: DC biasing plot takes ~50 seconds to load")
-        else:
-            dc_bias_message_label.grid_forget()  # Hide the message
+            update_status(f"DC Bias averages the current for up to {DC_BIAS_SECONDS} s; Stop ends it early", "info")
 
     # Bind the dropdown selection change to the filter_mode_changed function
     filter_dropdown.bind("<<ComboboxSelected>>", filter_mode_changed)
@@ -426,38 +753,11 @@ def start_main_application(root):
             return
 
         update_status("Zeroing in progress...", "warning")
-        zero_data = []  # ← Use a separate list, not `data`
-        ser.reset_input_buffer()
-        ser.write(b'ZERO\n')  # Signal to MCU
-        time.sleep(0.5)
-        ser.reset_input_buffer()    
-
-        start_time = time.time()
-        timeout = 10  # seconds
-        skip_first = True
-        while len(zero_data) < 100 and (time.time() - start_time) < timeout:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8').strip()
-                try:
-                    parts = list(map(int, line.split()))
-                    if len(parts) >= 4:
-                        if skip_first:
-                            print(f"Skipping first timing line: {parts}")
-                            skip_first = False
-                            continue
-                        adc1 = (parts[0] << 8) | parts[1]
-                        adc2 = (parts[2] << 8) | parts[3]
-                        avg_adc = (adc1 + adc2) / 2.0
-                        zero_data.append(avg_adc)
-                except:
-                    continue
-
-        ser.reset_input_buffer()  # Flush after zeroing!
-
-        if zero_data:
-            ByteCombine.baseline_adc_value = sum(zero_data) / len(zero_data)
+        baseline = capture_zero(ser, sample_count=100, timeout=10)
+
+        if baseline is not None:
+            ByteCombine.baseline_adc_value = baseline
             update_status(f"Zeroing complete. Baseline ADC: {ByteCombine.baseline_adc_value:.2f}", "success")
-            ser.reset_input_buffer()
         else:
             update_status("Zeroing failed: No data received.", "danger")
 
@@ -498,55 +798,29 @@ def start_main_application(root):
         global stop_thread, sample_count
         stop_thread = False
         selected_mode = filter_var.get()
+        end_live_stream()
         disable_buttons()
 
         if selected_mode == "DC Bias":
-            try:
-                ser.write(b'RESET\n')
-                time.sleep(0.5)
-                ser.reset_input_buffer()
-
-                print("Starting DC Bias read")
-                samples = []
-                skip_first = True
-                start_time = time.time()
-                timeout = 60  # seconds
-
-                while time.time() - start_time < timeout:
-                    if ser.in_waiting:
-                        line = ser.readline().decode('utf-8').strip()
-                        try:
-                            parts = list(map(int, line.split()))
-                            if skip_first:
-                                print(f"Skipping first timing line: {parts}")
-                                skip_first = False
-                                continue
-                            if len(parts) == 4:
-                                samples.append(parts)
-                        except:
-                            continue
-                    else:
-                        time.sleep(0.001)
-
-                ser.close()
-
-                if not samples:
-                    messagebox.showerror("Error", "No data collected in DC Bias mode.")
-                    return
-
-                # Pre-format the data as expected: [time, byte1, byte2, byte3, byte4]
-                sample_interval = 1 / 1_220_000
-                formatted = [[i * sample_interval] + row for i, row in enumerate(samples)]
+            binary = protocol_var.get() == "Binary"
+            start_capture(ser, binary)
+            update_status("Measuring DC Bias...", "info")
+            threading.Thread(target=read_dc_bias, args=(binary, bool(record_var.get())), daemon=True).start()
+            enable_buttons()
+            return
 
-                retake_settings = {
-                    "port": ser.port,  # Get from open serial object
-                    "filter_mode": filter_var.get()  # From dropdown
-                }
+        try:
+            trigger = read_trigger_settings()
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please enter a trigger level and pre/post sample counts (post > 0).")
+            enable_buttons()
+            return
 
-                # Call existing GUI launcher (this will use process_dc_bias_data internally)
-                process_and_launch_gui(formatted, retake_settings)
-            except Exception as e:
-                messagebox.showerror("Error", f"DC Bias mode failed:\n{e}")
+        if trigger:
+            start_capture(ser, protocol_var.get() == "Binary")
+            update_status(f"Waiting for trigger ({trigger['edge']}, {trigger['level']:g} A)...", "warning")
+            threading.Thread(target=read_triggered, args=(trigger,), daemon=True).start()
+            enable_buttons()
             return
 
         try:
@@ -555,20 +829,42 @@ def start_main_application(root):
                 raise ValueError
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter a valid number of samples (> 0).")
+            enable_buttons()
             return
 
-        ser.write(b'RESET\n')
-        time.sleep(0.5)  # Ensure MCU has time to start waveform
-        ser.reset_input_buffer()  # Final clean start
+        start_capture(ser, protocol_var.get() == "Binary")
         reading_thread = threading.Thread(target=read_from_serial, daemon=True)
         reading_thread.start()
         enable_buttons()
 
+    def start_live_view():
+        """Streams continuously into the live scope until Stop or the live window is closed."""
+        global live_thread
+        end_live_stream()
+        if not ser or not ser.is_open:
+            messagebox.showerror("Connection Error", "Serial port not open.")
+            return
+
+        window = get_live_window()
+        live_stop.clear()
+        live_buffer.clear()
+        binary = protocol_var.get() == "Binary"
+        start_capture(ser, binary)
+
+        recorder = new_recording(filter_var.get()) if record_var.get() else None
+        live_thread = threading.Thread(target=stream_live, args=(binary, recorder), daemon=True)
+        live_thread.start()
+        window.show()
+        window.raise_()
+        update_status("Live view running", "info")
+
     def stop_reading():
         global stop_thread
         stop_thread = True
+        live_stop.set()
         update_status("Reading stopped", "danger")
-        if ser and ser.is_open:
+        # A running live stream closes the port itself once its read returns
+        if ser and ser.is_open and not (live_thread is not None and live_thread.is_alive()):
             ser.close()
         
 
@@ -578,12 +874,26 @@ def start_main_application(root):
     control_frame.columnconfigure(0, weight=1)
     control_frame.columnconfigure(1, weight=1)
     control_frame.columnconfigure(2, weight=1)
+    control_frame.columnconfigure(3, weight=1)
 
     start_button = Button(control_frame, text="Start Reading", command=start_reading, bootstyle="success-outline")
     zero_button = Button(control_frame, text="Zero Current", command=start_zeroing, bootstyle="warning-outline")
     stop_button = Button(control_frame, text="Stop", command=stop_reading, bootstyle="danger-outline")
+    live_button = Button(control_frame, text="Live View", command=start_live_view, bootstyle="info-outline")
+
+    start_port_watcher()
+
+    # Recordings left as .part journals were interrupted by a crash; finalize them
+    recovered = recover_recordings(RECORDINGS_DIR)
+    if recovered:
+        log.warning("Recovered interrupted recordings: %s", recovered)
+        update_status(f"Recovered {len(recovered)} interrupted recording(s)", "warning")
 
 
 if __name__ == "__main__":
-    create_tkinter_gui()
+    configure_logging()
+    if "--bench-serial" in sys.argv:
+        measure_read_throughput()
+    else:
+        create_tkinter_gui()
 
@@ -0,0 +1,48 @@
+import numpy as np
+
+EXPORT_CHUNK_ROWS = 200_000  # Rows formatted and written per chunk
+
+
+def write_columns_csv(path, header, columns, chunk_rows=EXPORT_CHUNK_ROWS, on_progress=None):
+    """
+    Writes equal-length numeric columns to a CSV file in large buffered chunks.
+
+    Each chunk is formatted with a single %-format over the whole block, so values
+    print as Python floats would ("{x}") without a per-row Python loop.
+
+    Parameters:
+    - path: Output file path
+    - header: List of column titles
+    - columns: Sequence of 1-D arrays (or lists) of equal length
+    - chunk_rows: Rows per formatted chunk
+    - on_progress: Optional callback receiving the fraction written (0..1)
+    """
+    data = np.column_stack([np.asarray(c, dtype=np.float64) for c in columns])
+    rows = len(data)
+    row_format = ",".join(["%r"] * data.shape[1]) + "\n"
+
+    with open(path, "w", newline="", buffering=1 << 20) as f:
+        f.write(",".join(header) + "\n")
+        for start in range(0, rows, chunk_rows):
+            chunk = data[start:start + chunk_rows]
+            f.write((row_format * len(chunk)) % tuple(chunk.ravel().tolist()))
+            if on_progress:
+                on_progress(min(start + chunk_rows, rows) / rows)
+
+    if on_progress and rows == 0:
+        on_progress(1.0)
+
+
+def write_columns_binary(path, header, columns, on_progress=None):
+    """
+    Writes equal-length numeric columns to a .npy file as a structured float64
+    array whose field names are the column titles, so names and units survive:
+    np.load(path)["Time (us)"].
+    """
+    arrays = [np.asarray(c, dtype=np.float64) for c in columns]
+    data = np.empty(len(arrays[0]) if arrays else 0, dtype=[(title, np.float64) for title in header])
+    for title, values in zip(header, arrays):
+        data[title] = values
+    np.save(path, data)
+    if on_progress:
+        on_progress(1.0)
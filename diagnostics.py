@@ -0,0 +1,143 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Logging and per-stage timing shared by the acquisition, processing and GUI modules.
+#
+# Log level comes from TEESENSE_LOG_LEVEL (default WARNING), so debug chatter in
+# hot paths costs one level check. Stage timings are always collected; view them
+# from Tools > Diagnostics, or set TEESENSE_DIAGNOSTICS_FILE to dump them as JSON.
+LOG_LEVEL_ENV = "TEESENSE_LOG_LEVEL"
+DIAGNOSTICS_FILE_ENV = "TEESENSE_DIAGNOSTICS_FILE"
+DEFAULT_LOG_LEVEL = "WARNING"
+LOG_FORMAT = "[%(levelname)s] %(name)s: %(message)s"
+
+# Pipeline stages, in display order
+STAGES = ["acquisition", "conversion", "filtering", "metrics", "render"]
+
+
+def get_logger(name):
+    """Logger under the shared "teesense" hierarchy, e.g. get_logger("ByteCombine")."""
+    return logging.getLogger(f"teesense.{name}")
+
+
+def configure_logging(level=None):
+    """Sets the "teesense" log level (argument, TEESENSE_LOG_LEVEL, or WARNING) and a console handler."""
+    level = (level or os.environ.get(LOG_LEVEL_ENV) or DEFAULT_LOG_LEVEL).upper()
+    logger = logging.getLogger("teesense")
+    logger.setLevel(getattr(logging, level, logging.WARNING))
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+    logger.propagate = False
+    return logger
+
+
+class StageStats:
+    """Accumulated timing for one stage: calls, total/last/max seconds and items processed."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self.items = 0
+
+    def add(self, elapsed, items=0):
+        self.calls += 1
+        self.total += elapsed
+        self.last = elapsed
+        self.max = max(self.max, elapsed)
+        self.items += items
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "total_s": self.total,
+            "mean_s": self.total / self.calls if self.calls else 0.0,
+            "last_s": self.last,
+            "max_s": self.max,
+            "items": self.items,
+            "items_per_s": self.items / self.total if self.total else 0.0,
+        }
+
+
+class Diagnostics:
+    """Thread-safe registry of stage timers and event counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = OrderedDict((name, StageStats()) for name in STAGES)
+            self.counters = OrderedDict()
+            self.started = time.time()
+
+    @contextmanager
+    def stage(self, name, items=0):
+        """Times the enclosed block under `name`; `items` (e.g. samples) gives a throughput."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, items)
+
+    def record(self, name, elapsed, items=0):
+        with self._lock:
+            self.stages.setdefault(name, StageStats()).add(elapsed, items)
+
+    def count(self, name, n=1):
+        """Adds `n` to the event counter `name`."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "uptime_s": time.time() - self.started,
+                "stages": {name: stats.as_dict() for name, stats in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def format_report(self):
+        """Plain-text table of stage timings and counters."""
+        snap = self.snapshot()
+        lines = [f"{'Stage':<14}{'Calls':>7}{'Total (s)':>12}{'Mean (ms)':>12}{'Last (ms)':>12}"
+                 f"{'Max (ms)':>12}{'Items/s':>14}"]
+        for name, s in snap["stages"].items():
+            lines.append(f"{name:<14}{s['calls']:>7}{s['total_s']:>12.4f}{s['mean_s'] * 1e3:>12.2f}"
+                         f"{s['last_s'] * 1e3:>12.2f}{s['max_s'] * 1e3:>12.2f}{s['items_per_s']:>14,.0f}")
+        if snap["counters"]:
+            lines.append("")
+            lines.append("Counters")
+            lines.extend(f"  {name}: {value:,}" for name, value in snap["counters"].items())
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Writes the snapshot to `path` as JSON."""
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+diagnostics = Diagnostics()
+stage = diagnostics.stage
+count = diagnostics.count
+
+
+def dump_on_exit():
+    """Dumps the timings to TEESENSE_DIAGNOSTICS_FILE, if set."""
+    path = os.environ.get(DIAGNOSTICS_FILE_ENV)
+    if path:
+        diagnostics.dump(path)
+
+
+atexit.register(dump_on_exit)
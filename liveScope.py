@@ -0,0 +1,158 @@
+import threading
+import numpy as np
+from PyQt5 import QtCore
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from ByteCombine import SAMPLE_PERIOD
+from TeeSenseGUI import minmax_decimate
+
+LIVE_BUFFER_SAMPLES = 1 << 20  # ~0.86 s of history at 1.22 MHz
+LIVE_WINDOWS = [1_000, 5_000, 20_000, 100_000]  # Selectable samples on screen
+LIVE_DEFAULT_WINDOW = 5_000
+LIVE_MAX_FPS = 30  # Redraw cap; the timer skips frames when no new samples arrived
+LIVE_POINTS_PER_PIXEL = 2  # Windows longer than this are min/max decimated before drawing
+Y_MARGIN = 0.1  # Fraction of the data span added above and below on rescale
+
+
+class RingBuffer:
+    """
+    Fixed-size circular float64 buffer. The writer copies whole chunks in at
+    most two slices; readers take an ordered copy of the newest samples.
+    The lock is only held for those copies, so the writer never waits on a reader's work.
+    """
+
+    def __init__(self, capacity=LIVE_BUFFER_SAMPLES):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.float64)
+        self.total = 0  # Samples ever written
+        self._lock = threading.Lock()
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        n = len(values)
+        if n == 0:
+            return
+        with self._lock:
+            start = self.total % self.capacity
+            first = min(n, self.capacity - start)
+            self.data[start:start + first] = values[:first]
+            self.data[:n - first] = values[first:]
+            self.total += n
+
+    def latest(self, count):
+        """Newest min(count, available) samples, oldest first."""
+        with self._lock:
+            count = min(count, self.total, self.capacity)
+            end = self.total % self.capacity
+            if count <= end:
+                return self.data[end - count:end].copy()
+            return np.concatenate((self.data[self.capacity - (count - end):], self.data[:end]))
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+
+
+class LiveScopeWindow(QMainWindow):
+    """
+    Rolling oscilloscope view of a RingBuffer of currents (A). A QTimer redraws
+    the newest window at up to LIVE_MAX_FPS by blitting the trace onto a cached
+    background; axes are only fully redrawn when the trace leaves the Y range.
+    """
+    closed = pyqtSignal()
+
+    def __init__(self, buffer, sample_period=SAMPLE_PERIOD, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("TeeSense Live View")
+        self.resize(1000, 500)
+        self.buffer = buffer
+        self.sample_period = sample_period
+        self.window = LIVE_DEFAULT_WINDOW
+        self.last_total = -1
+        self.background = None
+
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_xlabel("Time before latest sample (ms)")
+        self.ax.set_ylabel("Current (mA)")
+        self.ax.grid(True)
+        self.line, = self.ax.plot([], [], animated=True)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+        self.window_selector = QComboBox()
+        self.window_selector.addItems([f"{n:,} samples" for n in LIVE_WINDOWS])
+        self.window_selector.setCurrentIndex(LIVE_WINDOWS.index(LIVE_DEFAULT_WINDOW))
+        self.window_selector.currentIndexChanged.connect(lambda i: self.set_window(LIVE_WINDOWS[i]))
+        self.stats_label = QLabel("Waiting for data...")
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Window:"))
+        controls.addWidget(self.window_selector)
+        controls.addStretch()
+        controls.addWidget(self.stats_label)
+
+        central = QWidget(self)
+        layout = QVBoxLayout(central)
+        layout.addLayout(controls)
+        layout.addWidget(self.canvas)
+        self.setCentralWidget(central)
+
+        self.set_window(self.window)
+
+        self.timer = QtCore.QTimer(self)  # Started in showEvent
+        self.timer.timeout.connect(self.refresh)
+
+    def set_window(self, window):
+        self.window = window
+        self.ax.set_xlim(-window * self.sample_period * 1e3, 0)
+        self.last_total = -1
+        self.canvas.draw_idle()
+
+    def on_draw(self, event):
+        # Axes, grid and labels were just rendered; cache them for blitting
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.line)
+
+    def refresh(self):
+        total = self.buffer.total
+        if total == self.last_total:
+            return
+        self.last_total = total
+
+        y = self.buffer.latest(self.window) * 1e3  # mA
+        if len(y) == 0:
+            return
+        x = (np.arange(len(y)) - len(y)) * self.sample_period * 1e3  # ms before latest
+
+        y_min, y_max = float(np.min(y)), float(np.max(y))
+        self.stats_label.setText(f"Mean {np.mean(y):.3f} mA   Min {y_min:.3f} mA   Max {y_max:.3f} mA   "
+                                 f"{total:,} samples")
+
+        width = max(int(self.ax.bbox.width), 100)
+        if len(y) > LIVE_POINTS_PER_PIXEL * width:
+            x, y = minmax_decimate(x, y, x[0], x[-1], width)
+        self.line.set_data(x, y)
+
+        low, high = self.ax.get_ylim()
+        pad = max((y_max - y_min) * Y_MARGIN, 1e-3)
+        shrunk = (high - low) > 4 * (y_max - y_min + 2 * pad)
+        if self.background is None or y_min < low or y_max > high or shrunk:
+            self.ax.set_ylim(y_min - pad, y_max + pad)
+            self.canvas.draw()  # Refreshes the cached background through on_draw
+        else:
+            self.canvas.restore_region(self.background)
+            self.ax.draw_artist(self.line)
+        self.canvas.blit(self.ax.bbox)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.timer.start(1000 // LIVE_MAX_FPS)
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
+        self.closed.emit()
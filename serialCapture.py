@@ -0,0 +1,459 @@
+import io
+import threading
+import time
+import numpy as np
+import serial
+from serial.tools import list_ports as serial_list_ports
+
+from ByteCombine import SAMPLE_PERIOD, BYTES_PER_SAMPLE, TriggerEngine, convert_frames
+from diagnostics import diagnostics, get_logger
+
+log = get_logger("serialCapture")
+
+BAUD_RATE = 115200
+
+RESET_CMD = b'RESET\n'  # Start ASCII capture ("b1 b2 b3 b4\n" per sample)
+BINARY_RESET_CMD = b'RESETBIN\n'  # Start binary capture (sync header + 4-byte frames)
+ZERO_CMD = b'ZERO\n'  # Stream with no load applied, for baseline zeroing
+SYNC_HEADER = b'\xAA\x55\xAA\x55'
+FRAME_SIZE = BYTES_PER_SAMPLE  # [ADC1 high, ADC1 low, ADC2 high, ADC2 low]
+
+START_DELAY = 0.5  # s for the MCU to (re)start its waveform after a command
+POLL_INTERVAL = 0.001  # s to sleep when no bytes are waiting
+MIN_READ_FRAMES = 256  # Smallest binary read; arrives in well under 1 ms, so stop checks stay responsive
+PORT_SCAN_INTERVAL = 1.0  # s between hot-plug port scans
+
+
+def _never():
+    return False
+
+
+def list_ports():
+    """
+    Enumerates serial ports from the OS (registry on Windows, /dev and sysfs on
+    Linux/macOS) without opening any of them. Returns sorted device names.
+    """
+    return sorted(info.device for info in serial_list_ports.comports())
+
+
+class PortWatcher:
+    """
+    Background thread that enumerates ports every `interval` seconds and calls
+    on_change(ports, forced) from that thread when the set of ports changes.
+    The first scan is always reported; rescan() forces an immediate report.
+    """
+
+    def __init__(self, on_change, interval=PORT_SCAN_INTERVAL):
+        self.on_change = on_change
+        self.interval = interval
+        self.ports = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._forced = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def rescan(self):
+        """Scans now and reports the result even if nothing changed."""
+        self._forced = True
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            forced, self._forced = self._forced, False
+            try:
+                ports = list_ports()
+            except Exception as e:
+                log.warning("Port enumeration failed: %s", e)
+                ports = self.ports or []
+
+            if forced or ports != self.ports:
+                self.ports = ports
+                self.on_change(ports, forced)
+
+            self._wake.wait(self.interval)
+
+
+def open_port(port):
+    """Opens a TeeSense serial port with the logger's line settings."""
+    ser = serial.Serial(port, BAUD_RATE, parity=serial.PARITY_NONE,
+                        bytesize=serial.EIGHTBITS, timeout=1)
+    ser.reset_input_buffer()
+    return ser
+
+
+def start_capture(ser, binary=False):
+    """Sends the RESET command for the selected protocol and flushes stale input."""
+    ser.reset_input_buffer()
+    ser.write(BINARY_RESET_CMD if binary else RESET_CMD)
+    time.sleep(START_DELAY)  # Ensure MCU has time to start waveform
+    ser.reset_input_buffer()  # Final clean start
+
+
+class AsciiFrameParser:
+    """
+    Incremental parser for the ASCII protocol ("b1 b2 b3 b4\\n" per line).
+    Feed it raw serial chunks; partial lines are kept until their newline arrives.
+    The first (timing) line and malformed lines are skipped; if the first line
+    arrives garbled it is dropped as the timing line, so the next line is kept as a sample.
+    """
+
+    def __init__(self, skip_first=True):
+        self.buffer = bytearray()
+        self.skip_first = skip_first
+
+    def feed(self, chunk):
+        """Returns the (k, 4) frames completed by `chunk`."""
+        self.buffer += chunk
+        end = self.buffer.rfind(b'\n')
+        if end < 0:
+            return np.empty((0, FRAME_SIZE), dtype=np.int64)
+
+        lines = bytes(self.buffer[:end]).split(b'\n')
+        del self.buffer[:end + 1]
+
+        frames = []
+        for line in lines:
+            try:
+                parts = list(map(int, line.split()))
+            except ValueError:
+                log.debug("Skipping malformed line: %s", line)
+                diagnostics.count("malformed_lines")
+                # Only the first line is the timing line, even when it is garbled
+                self.skip_first = False
+                continue
+
+            if self.skip_first:
+                log.debug("Skipping first timing line: %s", parts)
+                self.skip_first = False
+                continue
+
+            if len(parts) != FRAME_SIZE:
+                log.debug("Skipping malformed line: %s", parts)
+                diagnostics.count("malformed_lines")
+                continue
+
+            frames.append(parts)
+
+        return np.array(frames, dtype=np.int64).reshape(-1, FRAME_SIZE)
+
+
+class BinaryFrameParser:
+    """
+    Incremental parser for the binary protocol: input is discarded up to
+    SYNC_HEADER, then parsed as fixed 4-byte frames with np.frombuffer.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.synced = False
+
+    def sync(self, chunk):
+        """Buffers `chunk`, discarding input up to SYNC_HEADER. Returns True once synced."""
+        self.buffer += chunk
+
+        if not self.synced:
+            pos = self.buffer.find(SYNC_HEADER)
+            if pos < 0:
+                # Keep a possible partial header at the end of the buffer
+                del self.buffer[:-(len(SYNC_HEADER) - 1)]
+                return False
+            del self.buffer[:pos + len(SYNC_HEADER)]
+            self.synced = True
+
+        return True
+
+    def feed(self, chunk):
+        """Returns the (k, 4) frames completed by `chunk`."""
+        if not self.sync(chunk):
+            return np.empty((0, FRAME_SIZE), dtype=np.uint8)
+
+        usable = len(self.buffer) - len(self.buffer) % FRAME_SIZE
+        frames = np.frombuffer(bytes(self.buffer[:usable]), dtype=np.uint8).reshape(-1, FRAME_SIZE)
+        del self.buffer[:usable]
+        return frames
+
+
+def iter_frame_chunks(ser, duration=None, binary=False, should_stop=_never):
+    """
+    Duration mode: generator yielding (k, 4) frame chunks as they arrive, for
+    `duration` seconds (or until `should_stop()` when duration is None).
+    Nothing is retained between chunks, so callers can stream any length.
+    """
+    parser = BinaryFrameParser() if binary else AsciiFrameParser()
+    start_time = time.time()
+    while (duration is None or time.time() - start_time < duration) and not should_stop():
+        waiting = ser.in_waiting
+        if waiting:
+            start = time.perf_counter()
+            frames = parser.feed(ser.read(waiting))
+            diagnostics.record("acquisition", time.perf_counter() - start, len(frames))
+            diagnostics.count("samples_acquired", len(frames))
+            if len(frames):
+                yield frames
+        else:
+            time.sleep(POLL_INTERVAL)
+
+
+def _read_binary_frames(ser, sample_count, deadline, should_stop, on_progress, on_frames):
+    """Fills a preallocated buffer with readinto() after locking onto SYNC_HEADER."""
+    frames = bytearray(sample_count * FRAME_SIZE)
+    view = memoryview(frames)
+
+    parser = BinaryFrameParser()
+    while not parser.synced and not should_stop() and (deadline is None or time.time() < deadline):
+        chunk = ser.read(max(1, ser.in_waiting))
+        if chunk:
+            parser.sync(chunk)
+
+    # Bytes that followed the header in the sync read
+    rest = parser.buffer[:len(frames)]
+    view[:len(rest)] = rest
+    filled = len(rest)
+
+    result = np.frombuffer(frames, dtype=np.uint8).reshape(sample_count, FRAME_SIZE)
+    reported = 0
+
+    while True:
+        count = filled // FRAME_SIZE
+        if on_frames and count > reported:
+            on_frames(result[reported:count])
+            reported = count
+        if filled >= len(frames) or should_stop() or (deadline is not None and time.time() >= deadline):
+            break
+        # Ask only for what is waiting: a larger request blocks for the whole port timeout
+        size = min(len(frames) - filled, max(ser.in_waiting, FRAME_SIZE * MIN_READ_FRAMES))
+        filled += ser.readinto(view[filled:filled + size]) or 0
+        if on_progress:
+            on_progress(filled // FRAME_SIZE)
+
+    return result[:count]
+
+
+def _read_ascii_frames(ser, sample_count, deadline, should_stop, on_progress, on_frames):
+    frames = np.empty((sample_count, FRAME_SIZE), dtype=np.int64)
+    count = 0
+    parser = AsciiFrameParser()
+
+    while count < sample_count and not should_stop() and (deadline is None or time.time() < deadline):
+        chunk = ser.read(max(1, ser.in_waiting))
+        if not chunk:
+            continue
+
+        parsed = parser.feed(chunk)[:sample_count - count]
+        frames[count:count + len(parsed)] = parsed
+        count += len(parsed)
+        if len(parsed):
+            if on_frames:
+                on_frames(parsed)
+            if on_progress:
+                on_progress(count)
+
+    return frames[:count]
+
+
+def capture_samples(ser, sample_count, timeout=None, binary=False, should_stop=_never, on_progress=None,
+                    on_frames=None):
+    """
+    N-samples mode: reads up to `sample_count` samples into preallocated storage.
+
+    Parameters:
+    - ser: Open serial port (already started with start_capture)
+    - sample_count: Number of samples to collect
+    - timeout: Give up after this many seconds (None waits until should_stop)
+    - binary: Use the binary framed protocol instead of ASCII
+    - should_stop: Callable polled between reads to cancel the capture
+    - on_progress: Optional callback receiving the number of samples read so far
+    - on_frames: Optional callback receiving each new (k, 4) chunk of frames, e.g. CaptureRecorder.write
+
+    Returns:
+    - (N, 4) NumPy array of the four bytes per sample (N < sample_count if stopped early)
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    reader = _read_binary_frames if binary else _read_ascii_frames
+    start = time.perf_counter()
+    frames = reader(ser, sample_count, deadline, should_stop, on_progress, on_frames)
+    diagnostics.record("acquisition", time.perf_counter() - start, len(frames))
+    diagnostics.count("samples_acquired", len(frames))
+    return frames
+
+
+def capture_zero(ser, sample_count=100, timeout=10, binary=False):
+    """
+    Zeroing mode: asks the MCU for an unloaded stream and averages it.
+
+    Returns:
+    - Mean ADC word (average of both ADCs) or None if nothing was received
+    """
+    ser.reset_input_buffer()
+    ser.write(ZERO_CMD)  # Signal to MCU
+    time.sleep(START_DELAY)
+    ser.reset_input_buffer()
+
+    frames = capture_samples(ser, sample_count, timeout=timeout, binary=binary)
+
+    ser.reset_input_buffer()  # Flush after zeroing!
+
+    if len(frames) == 0:
+        return None
+
+    raw = frames.astype(np.int64)
+    adc1 = (raw[:, 0] << 8) | raw[:, 1]
+    adc2 = (raw[:, 2] << 8) | raw[:, 3]
+    return float(((adc1 + adc2) / 2.0).mean())
+
+
+class TriggerWindowCollector:
+    """
+    Pre-trigger capture. The newest `pre_samples` frames are kept in a circular
+    buffer; when the converted current (A) fires the TriggerEngine, that history
+    plus the `post_samples` frames from the trigger on form one window. The
+    trigger re-arms after each window's last sample, and everything outside a
+    window is discarded.
+    """
+
+    def __init__(self, level, edge="Rising", pre_samples=1000, post_samples=4000, baseline=None,
+                 hysteresis=0.0, holdoff=0):
+        self.engine = TriggerEngine(level, edge, hysteresis, holdoff)
+        self.pre = pre_samples
+        self.post = post_samples
+        self.baseline = baseline
+
+        self.ring = np.zeros((max(pre_samples, 1), FRAME_SIZE), dtype=np.uint8)
+        self.ring_end = 0  # Next write position
+        self.ring_filled = 0
+        self.pending = None  # Window still waiting for post-trigger samples
+        self.pending_fill = 0
+
+    def feed(self, frames):
+        """Consumes a (k, 4) frame chunk. Returns the list of (pre + post, 4) windows it completed."""
+        frames = np.asarray(frames).astype(np.uint8, copy=False)
+        if len(frames) == 0:
+            return []
+
+        completed = []
+        search_from = 0
+        if self.pending is not None:
+            take = min(len(frames), len(self.pending) - self.pending_fill)
+            self.pending[self.pending_fill:self.pending_fill + take] = frames[:take]
+            self.pending_fill += take
+            search_from = take
+            if self.pending_fill == len(self.pending):
+                completed.append(self.pending)
+                self.pending = None
+
+        candidates = self.engine.feed(convert_frames(frames, self.baseline))
+
+        while self.pending is None:
+            k = np.searchsorted(candidates, search_from)
+            if k == len(candidates):
+                break
+            idx = int(candidates[k])
+            if self.ring_filled + idx < self.pre:
+                search_from = idx + 1  # Not enough pre-trigger history yet
+                continue
+
+            window = np.empty((self.pre + self.post, FRAME_SIZE), dtype=np.uint8)
+            from_chunk = min(idx, self.pre)
+            from_ring = self.pre - from_chunk
+            window[:from_ring] = self.latest_history(from_ring)
+            window[from_ring:self.pre] = frames[idx - from_chunk:idx]
+
+            available = min(self.post, len(frames) - idx)
+            window[self.pre:self.pre + available] = frames[idx:idx + available]
+            if available == self.post:
+                completed.append(window)
+                search_from = idx + self.post
+            else:
+                self.pending = window
+                self.pending_fill = self.pre + available
+
+        self.push_history(frames)
+        return completed
+
+    def latest_history(self, count):
+        """Newest `count` frames from the circular buffer, oldest first."""
+        if count == 0:
+            return self.ring[:0]
+        idx = (self.ring_end - count + np.arange(count)) % len(self.ring)
+        return self.ring[idx]
+
+    def push_history(self, frames):
+        tail = frames[-len(self.ring):]
+        idx = (self.ring_end + np.arange(len(tail))) % len(self.ring)
+        self.ring[idx] = tail
+        self.ring_end = (self.ring_end + len(tail)) % len(self.ring)
+        self.ring_filled = min(self.ring_filled + len(tail), len(self.ring))
+
+
+def capture_triggered(ser, level, edge="Rising", pre_samples=1000, post_samples=4000, events=1,
+                      timeout=None, binary=False, should_stop=_never, on_progress=None, baseline=None,
+                      hysteresis=0.0, holdoff=0):
+    """
+    Triggered mode: streams until `events` trigger windows were captured (or
+    timeout/should_stop), keeping only the samples around each trigger.
+
+    Returns:
+    - List of (pre_samples + post_samples, 4) uint8 frame windows; the trigger is at index pre_samples
+    """
+    collector = TriggerWindowCollector(level, edge, pre_samples, post_samples, baseline, hysteresis, holdoff)
+    windows = []
+    for frames in iter_frame_chunks(ser, timeout, binary, should_stop):
+        windows.extend(collector.feed(frames))
+        if on_progress:
+            on_progress(min(len(windows), events))
+        if len(windows) >= events:
+            break
+    return windows[:events]
+
+
+def frames_to_rows(frames, sample_period=SAMPLE_PERIOD, start_time=0.0):
+    """Prepends the fixed-step time column to (N, 4) frames → (N, 5) [time, b1, b2, b3, b4]."""
+    times = start_time + np.arange(len(frames), dtype=np.float64) * sample_period
+    return np.column_stack((times, frames.astype(np.float64)))
+
+
+class SimulatedSerial:
+    """Minimal serial.Serial stand-in that replays (N, 4) frames in either protocol."""
+
+    def __init__(self, frames, binary=False, chunk_size=4096):
+        frames = np.asarray(frames, dtype=np.uint8)
+
+        if binary:
+            payload = b'\x00' * 7 + SYNC_HEADER + frames.tobytes()
+        else:
+            lines = "\n".join(" ".join(map(str, row)) for row in frames.tolist())
+            payload = f"0 0 0 0\n{lines}\n".encode('utf-8')
+
+        self.port = "SIM"
+        self.is_open = True
+        self.chunk_size = chunk_size
+        self._stream = io.BytesIO(payload)
+        self._size = len(payload)
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk_size, self._size - self._stream.tell())
+
+    def read(self, size=1):
+        return self._stream.read(min(size, self.chunk_size))
+
+    def readinto(self, buffer):
+        return self._stream.readinto(buffer)
+
+    def write(self, data):
+        return len(data)
+
+    def reset_input_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
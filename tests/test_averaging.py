@@ -0,0 +1,79 @@
+import math
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+import TeeSenseGUI
+from ByteCombine import SAMPLE_PERIOD, TriggerEngine
+
+LENGTH = 1000
+HOLDOFF_SAMPLES = 50
+HOLDOFF_SECONDS = 5e-5  # ~61 samples
+
+
+def pulse_trace(shift):
+    """A glitch pair at 100/110 samples and the real pulse at 500, all moved by `shift` samples."""
+    x = np.arange(LENGTH) * SAMPLE_PERIOD
+    y = np.zeros(LENGTH)
+    for start, stop in ((100, 105), (110, 115), (500, 700)):
+        y[start + shift:stop + shift] = 1.0
+    return x, y
+
+
+@pytest.fixture(scope="module")
+def qt_app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def ui(qt_app):
+    window = TeeSenseGUI.AnalysisWindow()
+    ui = TeeSenseGUI.Ui_MainWindow()
+    ui.setupUi(window)
+    yield ui
+    window.deleteLater()
+
+
+def test_retake_engine_converts_holdoff_with_sample_period(ui, monkeypatch):
+    ui.trigger_threshold.setText("0.5")
+    ui.trigger_holdoff.setText(f"{HOLDOFF_SECONDS:g}")
+    ui.trigger_event_input.setText("2")
+    ui.average_input.setValue(4)
+    ui.retake_settings = {"port": "SIM", "samples": LENGTH, "filter_mode": "Unfiltered", "protocol": "Binary"}
+
+    built = {}
+
+    class Captured(Exception):
+        pass
+
+    def fake_worker(settings, trigger_engine=None, trigger_event=1):
+        built.update(settings=settings, engine=trigger_engine, event=trigger_event)
+        raise Captured
+
+    monkeypatch.setattr(TeeSenseGUI, "AcquisitionWorker", fake_worker)
+    with pytest.raises(Captured):
+        ui.retake_measurement()
+
+    assert built["settings"]["averages"] == 4
+    assert built["engine"].holdoff == math.ceil(HOLDOFF_SECONDS / SAMPLE_PERIOD)
+    assert built["event"] == 2
+
+
+def test_average_captures_honours_holdoff(qt_app):
+    # With the holdoff the glitch at 110 is ignored, so event 2 is the real pulse at 500
+    engine = TriggerEngine(0.5, "Rising", holdoff=HOLDOFF_SAMPLES)
+    worker = TeeSenseGUI.AcquisitionWorker({}, engine, trigger_event=2)
+    shifts = iter([0, 7, 13, 21])
+
+    x, mean, frames = worker.average_captures(lambda: np.zeros((LENGTH, 4)), lambda _: pulse_trace(next(shifts)), 4)
+
+    assert frames is None
+    inside = np.searchsorted(x, 50 * SAMPLE_PERIOD)
+    before = np.searchsorted(x, -50 * SAMPLE_PERIOD)
+    assert mean[inside] == pytest.approx(1.0)
+    assert mean[before] == pytest.approx(0.0)
+    assert np.max(worker.envelope["std"]) == pytest.approx(0.0, abs=1e-9)